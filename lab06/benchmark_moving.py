@@ -0,0 +1,415 @@
+"""
+Author:Isaac McKinney
+benchmark_moving.py
+
+Times the packing strategies in moving.py on generated boxes and items.
+Compares the heap/bisect versions of roomiest and tightest_fit against the old scan and re-sort versions,
+and times each stage of the pipeline on generated manifests.
+"""
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+import moving
+
+
+@dataclass
+class OLD_ITEM:
+    """
+    the old ITEM layout, with a __dict__ per instance. kept to compare against
+    """
+    name: str
+    weight: int
+
+
+@dataclass
+class OLD_BOX:
+    """
+    the old BOX layout, with a __dict__ per instance and a list of ITEM objects. kept to compare against
+    """
+    capacity: int
+    items: []
+
+
+def old_sort_items(items):
+    """
+    the old recursive three-way quicksort for items, by decreasing weight. kept to compare against
+    :param items: the items to be sorted
+    :return: the sorted items list
+    """
+    if items == []:
+        return []
+    pivot = items[0].weight
+    (less, same, more) = ([], [], [])
+    for i in items:
+        if i.weight < pivot:
+            more.append(i)
+        elif i.weight > pivot:
+            less.append(i)
+        else:
+            same.append(i)
+    return old_sort_items(less) + same + old_sort_items(more)
+
+
+def old_sort_boxes(boxes):
+    """
+    the old recursive three-way quicksort for boxes, by increasing capacity. kept to compare against
+    :param boxes: the boxes to be sorted
+    :return: the sorted boxes list
+    """
+    if boxes == []:
+        return []
+    pivot = boxes[0].capacity
+    (less, same, more) = ([], [], [])
+    for i in boxes:
+        if i.capacity < pivot:
+            less.append(i)
+        elif i.capacity > pivot:
+            more.append(i)
+        else:
+            same.append(i)
+    return old_sort_boxes(less) + same + old_sort_boxes(more)
+
+
+def old_roomiest(items, boxes):
+    """
+    the old roomiest, which scans every box for every item. kept to compare against
+    :param items: the sorted items being packed
+    :param boxes: the boxes being filled
+    :return N/A
+    """
+    for item in items:
+        largest_box = boxes[0]
+        for box in boxes:
+            if box.capacity > largest_box.capacity:
+                largest_box = box
+        if item.weight <= largest_box.capacity:
+            largest_box.items.append(item)
+            largest_box.capacity -= item.weight
+
+
+def old_tightest_fit(items, boxes):
+    """
+    the old tightest_fit, which re-sorts every box for every item. kept to compare against
+    :param items: the sorted items being packed
+    :param boxes: the boxes being filled
+    :return N/A
+    """
+    for item in items:
+        boxes = old_sort_boxes(boxes)
+        for box in boxes:
+            if item.weight <= box.capacity:
+                box.items.append(item)
+                box.capacity -= item.weight
+                break
+
+
+def make_manifest(num_boxes, num_items, seed):
+    """
+    makes random box capacities and item weights
+    :param num_boxes: how many boxes to make
+    :param num_items: how many items to make
+    :param seed: the random seed so runs can be repeated
+    :return: list of capacities and list of (name, weight) pairs
+    """
+    rng = random.Random(seed)
+    capacities = [rng.randint(1, 50) for _ in range(num_boxes)]
+    items = [("item" + str(i), rng.randint(1, 20)) for i in range(num_items)]
+    return capacities, items
+
+
+def time_strategy(strategy, capacities, items):
+    """
+    times one strategy on fresh boxes
+    :param strategy: the packing function
+    :param capacities: the box capacities
+    :param items: the (name, weight) pairs
+    :return: the seconds taken and the packed boxes
+    """
+    boxes = [moving.BOX(capacity, []) for capacity in capacities]
+    sorted_items = moving.sort_items([moving.ITEM(name, weight) for name, weight in items])
+    start = time.perf_counter()
+    strategy(sorted_items, boxes)
+    return time.perf_counter() - start, boxes
+
+
+def adversarial_weights(kind, size, seed):
+    """
+    makes item weights that are hard on a first element pivot quicksort
+    :param kind: one of "ascending", "descending", "equal", "few" or "random"
+    :param size: how many weights to make
+    :param seed: the random seed so runs can be repeated
+    :return: the list of weights
+    """
+    if kind == "ascending":
+        return list(range(size))
+    if kind == "descending":
+        return list(range(size, 0, -1))
+    if kind == "equal":
+        return [7] * size
+    rng = random.Random(seed)
+    if kind == "few":
+        return [rng.randint(1, 3) for _ in range(size)]
+    return [rng.randint(1, size) for _ in range(size)]
+
+
+def bench_sorting(sizes):
+    """
+    times the old quicksort and the new sort_items on adversarial inputs and checks they agree
+    the old sort is reported as a RecursionError when the input is too deep for it
+    :param sizes: the item counts to try
+    :return N/A
+    """
+    for size in sizes:
+        for kind in ("ascending", "descending", "equal", "few", "random"):
+            items = [moving.ITEM("item" + str(i), weight)
+                     for i, weight in enumerate(adversarial_weights(kind, size, size))]
+            start = time.perf_counter()
+            new = moving.sort_items(items)
+            new_time = time.perf_counter() - start
+            try:
+                start = time.perf_counter()
+                old = old_sort_items(items)
+                old_result = format(time.perf_counter() - start, ".4f") + "s"
+                if old != new:
+                    raise AssertionError("sort_items disagrees on " + kind + " input of " + str(size))
+            except RecursionError:
+                old_result = "RecursionError"
+            print("sort_items " + kind + " n=" + str(size) + " old=" + old_result
+                  + " new=" + format(new_time, ".4f") + "s")
+
+
+DISTRIBUTIONS = ("uniform", "small", "large", "ascending", "descending", "equal")
+
+
+def item_weights(distribution, num_items, max_weight, rng):
+    """
+    makes item weights from 1 to max_weight
+    :param distribution: one of DISTRIBUTIONS. "small" and "large" lean toward light or heavy items,
+    "ascending" and "descending" come already sorted and "equal" are all the same weight
+    :param num_items: how many weights to make
+    :param max_weight: the heaviest weight
+    :param rng: the random.Random to draw from
+    :return: the list of weights
+    """
+    if distribution == "uniform":
+        return [rng.randint(1, max_weight) for _ in range(num_items)]
+    if distribution == "small":
+        return [1 + int(rng.expovariate(4 / max_weight)) % max_weight for _ in range(num_items)]
+    if distribution == "large":
+        return [max_weight - int(rng.expovariate(4 / max_weight)) % max_weight for _ in range(num_items)]
+    if distribution == "ascending":
+        return sorted(rng.randint(1, max_weight) for _ in range(num_items))
+    if distribution == "descending":
+        return sorted((rng.randint(1, max_weight) for _ in range(num_items)), reverse=True)
+    if distribution == "equal":
+        return [max_weight // 2 or 1] * num_items
+    raise ValueError("unknown distribution " + str(distribution))
+
+
+def make_manifest_lines(num_boxes, num_items, seed, distribution="uniform", max_weight=20, slack=1.0):
+    """
+    makes the lines of a manifest file
+    the box capacities add up to slack times the total item weight, split as evenly as possible
+    :param num_boxes: how many boxes to make
+    :param num_items: how many items to make
+    :param seed: the random seed so runs can be repeated
+    :param distribution: how the item weights are drawn, one of DISTRIBUTIONS
+    :param max_weight: the heaviest item
+    :param slack: how much room the boxes have compared to the items
+    :return: the first line of capacities and the list of item lines
+    """
+    rng = random.Random(seed)
+    weights = item_weights(distribution, num_items, max_weight, rng)
+    total = int(sum(weights) * slack)
+    capacities = [total // num_boxes + (1 if box < total % num_boxes else 0) for box in range(num_boxes)]
+    first_line = " ".join(str(capacity) for capacity in capacities)
+    # names repeat, like the same kinds of things showing up across a big move
+    lines = ["item" + str(rng.randrange(500)) + " " + str(weight) + "\n" for weight in weights]
+    return first_line, lines
+
+
+def write_manifest(filename, num_boxes, num_items, seed, distribution="uniform", max_weight=20, slack=1.0):
+    """
+    writes a generated manifest in the same format as the items*.txt files
+    :param filename: the file to write
+    the other parameters are the same as make_manifest_lines
+    :return N/A
+    """
+    first_line, lines = make_manifest_lines(num_boxes, num_items, seed, distribution, max_weight, slack)
+    with open(filename, "w") as f:
+        f.write(first_line + "\n")
+        f.writelines(lines)
+
+
+def measure(build):
+    """
+    measures the memory held by what build makes
+    :param build: a function with no arguments
+    :return: tuple of (bytes still held after build, peak bytes during build)
+    """
+    tracemalloc.start()
+    kept = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current, peak
+
+
+def bench_memory(sizes, num_boxes=100):
+    """
+    compares the memory of the old layout (ITEM and BOX objects with a __dict__, boxes holding lists of ITEMs)
+    with the new one (ITEM_STORE arrays, and boxes holding ranges of item ids from pack_store)
+    :param sizes: the item counts to try
+    :param num_boxes: how many boxes each manifest has
+    :return N/A
+    """
+    for size in sizes:
+        first_line, lines = make_manifest_lines(num_boxes, size, size)
+
+        def build_old():
+            boxes = [OLD_BOX(int(part), []) for part in first_line.split()]
+            items = [OLD_ITEM(line.split()[0], int(line.split()[1])) for line in lines]
+            old_roomiest(old_sort_items(items), boxes)
+            return boxes, items
+
+        def build_new():
+            items = moving.parse_items(lines)
+            capacities = [int(part) for part in first_line.split()]
+            return items, moving.pack_store(items, capacities, "roomiest")
+
+        old_current, old_peak = measure(build_old)
+        new_current, new_peak = measure(build_new)
+        print("memory items=" + str(size) + " boxes=" + str(num_boxes)
+              + " old=" + format(old_current / size, ".1f") + " bytes/item (peak " + format(old_peak / 1e6, ".1f") + " MB)"
+              + " new=" + format(new_current / size, ".1f") + " bytes/item (peak " + format(new_peak / 1e6, ".1f") + " MB)")
+
+
+def time_pipeline(filename):
+    """
+    times each stage of the packing pipeline on one manifest file: parse, sort, then each strategy
+    :param filename: the manifest file
+    :return: dict of stage name to seconds
+    """
+    times = {}
+    start = time.perf_counter()
+    boxes, items = moving.make_boxes_and_items(filename)
+    times["parse"] = time.perf_counter() - start
+    start = time.perf_counter()
+    items = moving.sort_items(items)
+    times["sort"] = time.perf_counter() - start
+    capacities = [box.capacity for box in boxes]
+    for name, strategy in moving.STRATEGIES.items():
+        fresh = [moving.BOX(capacity, []) for capacity in capacities]
+        start = time.perf_counter()
+        strategy(items, fresh)
+        times["pack_" + name] = time.perf_counter() - start
+    return times
+
+
+def peak_pipeline(filename):
+    """
+    measures the peak memory of each stage of the packing pipeline, in a separate run from the timing
+    because tracemalloc slows everything down
+    :param filename: the manifest file
+    :return: dict of stage name to peak bytes
+    """
+    peaks = {}
+    tracemalloc.start()
+    boxes, items = moving.make_boxes_and_items(filename)
+    peaks["parse"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    items = moving.sort_items(items)
+    peaks["sort"] = tracemalloc.get_traced_memory()[1]
+    capacities = [box.capacity for box in boxes]
+    for name, strategy in moving.STRATEGIES.items():
+        tracemalloc.reset_peak()
+        strategy(items, [moving.BOX(capacity, []) for capacity in capacities])
+        peaks["pack_" + name] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peaks
+
+
+def bench_pipeline(output, sizes, num_boxes=100, distributions=DISTRIBUTIONS, seed=0):
+    """
+    runs the whole pipeline on generated manifests and saves the stage times and peak memory as JSON,
+    so results from different versions can be compared
+    :param output: the JSON file to write
+    :param sizes: the item counts to try
+    :param num_boxes: how many boxes each manifest has
+    :param distributions: the weight distributions to try
+    :param seed: the random seed so runs can be repeated
+    :return: the list of result rows
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            for distribution in distributions:
+                filename = os.path.join(folder, "items_" + distribution + "_" + str(size) + ".txt")
+                write_manifest(filename, num_boxes, size, seed, distribution)
+                times = time_pipeline(filename)
+                peaks = peak_pipeline(filename)
+                for stage in times:
+                    rows.append({"distribution": distribution, "boxes": num_boxes, "items": size,
+                                 "stage": stage, "seconds": times[stage], "peak_bytes": peaks[stage]})
+                    print(distribution + " items=" + str(size) + " " + stage + " "
+                          + format(times[stage], ".4f") + "s peak " + format(peaks[stage] / 1e6, ".1f") + " MB")
+    with open(output, "w") as f:
+        json.dump({"python": platform.python_version(), "seed": seed, "results": rows}, f, indent=1)
+    return rows
+
+
+def bench_strategies(num_items):
+    """
+    runs the old and new strategies at 10^3, 10^4 and 10^5 boxes and prints the speedup
+    :param num_items: how many items to pack
+    :return N/A
+    """
+    pairs = [("roomiest", old_roomiest, moving.roomiest),
+             ("tightest_fit", old_tightest_fit, moving.tightest_fit)]
+    for num_boxes in (10 ** 3, 10 ** 4, 10 ** 5):
+        capacities, items = make_manifest(num_boxes, num_items, num_boxes)
+        for name, old, new in pairs:
+            old_time, old_boxes = time_strategy(old, capacities, items)
+            new_time, new_boxes = time_strategy(new, capacities, items)
+            if [box.items for box in old_boxes] != [box.items for box in new_boxes]:
+                raise AssertionError(name + " packed differently at " + str(num_boxes) + " boxes")
+            print(name + " boxes=" + str(num_boxes) + " items=" + str(num_items)
+                  + " old=" + format(old_time, ".4f") + "s new=" + format(new_time, ".4f") + "s"
+                  + " speedup=" + format(old_time / max(new_time, 1e-9), ".1f") + "x")
+
+
+def main():
+    """
+    runs a benchmark from the command line
+    usage: benchmark_moving.py strategies [num_items] | sorting [size ...] | memory [size ...]
+           | pipeline <results.json> [size ...]
+           | generate <manifest file> <boxes> <items> [distribution] [seed]
+    :return N/A
+    """
+    mode = sys.argv[1] if len(sys.argv) > 1 else "strategies"
+    if mode == "sorting":
+        sizes = [int(size) for size in sys.argv[2:]] or [10 ** 3, 10 ** 4, 10 ** 5]
+        bench_sorting(sizes)
+    elif mode == "memory":
+        sizes = [int(size) for size in sys.argv[2:]] or [10 ** 4, 10 ** 5, 10 ** 6]
+        bench_memory(sizes)
+    elif mode == "pipeline":
+        sizes = [int(size) for size in sys.argv[3:]] or [10 ** 3, 10 ** 4, 10 ** 5]
+        bench_pipeline(sys.argv[2], sizes)
+    elif mode == "generate":
+        distribution = sys.argv[5] if len(sys.argv) > 5 else "uniform"
+        seed = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+        write_manifest(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), seed, distribution)
+    else:
+        bench_strategies(int(sys.argv[2]) if len(sys.argv) > 2 else 100)
+
+
+if __name__ == '__main__':
+    main()
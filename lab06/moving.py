@@ -5,10 +5,19 @@ moving.py
 Takes a text file telling us the box capacities and the items we want to store in those boxes for moving.
 Then it takes those items and sorts them accordingly into the boxes
 """
+import bisect
+import glob
+import heapq
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from operator import attrgetter
 
 
-@dataclass
+@dataclass(slots=True)
 class ITEM:
     """
     data class for items that will be put in boxes
@@ -19,7 +28,7 @@ class ITEM:
     weight: int
 
 
-@dataclass
+@dataclass(slots=True)
 class BOX:
     """
     data class for the boxes holding the items
@@ -30,16 +39,174 @@ class BOX:
     items: []
 
 
+@dataclass(slots=True)
+class PACKING:
+    """
+    data class for the result of a packing strategy
+    assignments: list of (item, box position) pairs, in the order the items were packed
+    unpacked: the items that did not fit in any box
+    remaining: the remaining capacity of each box, in the same order as the boxes
+    """
+    assignments: []
+    unpacked: []
+    remaining: []
+
+
+@dataclass(slots=True)
+class STORE_PACKING:
+    """
+    data class for the result of pack_store, with box contents kept as item ids into the ITEM_STORE
+    starts: array where box b holds contents[starts[b]:starts[b + 1]]
+    contents: array of the packed item ids, grouped by box and in packing order within a box
+    unpacked: array of the ids of items that did not fit in any box
+    remaining: array of the 64 bit remaining capacity of each box
+    """
+    starts: array
+    contents: array
+    unpacked: array
+    remaining: array
+
+    def box_contents(self, position):
+        """
+        :param position: the box position
+        :return: the item ids in that box
+        """
+        return self.contents[self.starts[position]:self.starts[position + 1]]
+
+
+@dataclass(slots=True)
+class ITEM_STORE:
+    """
+    compact columnar storage for the items of a manifest
+    names: the table of distinct item names, each name is stored once
+    ids: maps each name to its place in names
+    name_ids: array of indexes into names, one per item
+    weights: array of 64 bit item weights, one per item
+    indexing or iterating gives ITEM views made on demand
+    """
+    names: []
+    ids: dict
+    name_ids: array
+    weights: array
+
+    def add(self, name, weight):
+        """
+        adds one item to the end of the store
+        :param name: name of item
+        :param weight: weight of item
+        :return N/A
+        """
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.ids[name] = name_id
+            self.names.append(name)
+        self.name_ids.append(name_id)
+        self.weights.append(weight)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __getitem__(self, index):
+        return ITEM(self.names[self.name_ids[index]], self.weights[index])
+
+    def __iter__(self):
+        names = self.names
+        for name_id, weight in zip(self.name_ids, self.weights):
+            yield ITEM(names[name_id], weight)
+
+
+# the most keys a SORTED_KEYS block holds before it is split in half
+BLOCK_SIZE = 512
+
+
+class SORTED_KEYS:
+    """
+    a sorted set of keys kept in blocks, like the Car_Index of the train yard
+    adding or removing a key is a bisect over the block maxes and a change inside one block of at most
+    BLOCK_SIZE keys, so it costs O(log n + BLOCK_SIZE) where a plain sorted list moves O(n) keys.
+    only splitting a block moves the list of maxes
+    blocks: lists of keys, each sorted, and every key in a block is smaller than the keys of the next block
+    maxes: the largest key in each block
+    """
+
+    def __init__(self, keys=()):
+        """
+        fills the blocks half full from the given keys
+        :param keys: the starting keys, no two equal
+        """
+        keys = sorted(keys)
+        step = BLOCK_SIZE // 2
+        self.blocks = [keys[spot:spot + step] for spot in range(0, len(keys), step)]
+        self.maxes = [block[-1] for block in self.blocks]
+
+    def first(self):
+        """
+        :return: the smallest key, or None if there are none
+        """
+        if self.blocks:
+            return self.blocks[0][0]
+        return None
+
+    def first_at_least(self, key):
+        """
+        :param key: the key to compare against
+        :return: the smallest key that is >= key, or None if there is none
+        """
+        spot = bisect.bisect_left(self.maxes, key)
+        if spot == len(self.blocks):
+            return None
+        block = self.blocks[spot]
+        return block[bisect.bisect_left(block, key)]
+
+    def add(self, key):
+        """
+        :param key: the key to add, not equal to any key already in
+        :return N/A
+        """
+        blocks = self.blocks
+        if not blocks:
+            blocks.append([key])
+            self.maxes.append(key)
+            return
+        spot = bisect.bisect_left(self.maxes, key)
+        if spot == len(blocks):
+            spot -= 1
+        block = blocks[spot]
+        bisect.insort(block, key)
+        if len(block) > BLOCK_SIZE:
+            half = len(block) // 2
+            blocks.insert(spot + 1, block[half:])
+            self.maxes.insert(spot + 1, block[-1])
+            del block[half:]
+        self.maxes[spot] = block[-1]
+
+    def remove(self, key):
+        """
+        :param key: the key to take out, which must be in
+        :return N/A
+        """
+        spot = bisect.bisect_left(self.maxes, key)
+        block = self.blocks[spot]
+        del block[bisect.bisect_left(block, key)]
+        if block:
+            self.maxes[spot] = block[-1]
+        else:
+            del self.blocks[spot]
+            del self.maxes[spot]
+
+
 def make_boxes_and_items(filename):
     """
-    makes the boxes list and items list using the data classes
+    makes the boxes list and items store while reading the file only once
     pre-condition: filename is entered in
     post-condition: filename is entered in and both the boxes and items have been created
-    :param filename: the text file being passed to make_boxes and make_items
-    :return: boxes list and items list with appropriate keys and values
+    :param filename: the text file being read
+    :return: boxes list and ITEM_STORE of the items
     """
-    boxes = make_boxes(filename)
-    items = make_items(filename)
+    with open(filename) as f:
+        boxes = parse_boxes(f.readline())
+        items = parse_items(f)
     return boxes, items
 
 
@@ -52,31 +219,46 @@ def make_boxes(filename):
     :param filename: the text file being passed in to read and make boxes
     :return: the list of boxes, "boxes"
     """
-    boxes = []
     with open(filename) as f:
-        first_line = f.readline()
-        parts = first_line.split(" ")
-        for part in parts:
-            newBox = BOX(int(part), [])
-            boxes.append(newBox)
-    return boxes
+        return parse_boxes(f.readline())
 
 
 def make_items(filename):
     """
-        creates a list of itens, which contain the item's weight and item's name as parts of the list from the dataclass
-        pre-condition: filename is passed in and items list is empty
-        post-condition: filename is passed in and items list is filled with the appropriate amount of items,
-        each with corresponding capacities and items are
+        creates the store of items, which holds each item's weight and name
+        pre-condition: filename is passed in
+        post-condition: every item line after the first line of the file is in the store
         :param filename: the text file being passed in to read and make items
-        :return: the list of items, "items"
+        :return: the ITEM_STORE of items, "items"
     """
-    items = []
     with open(filename) as f:
         next(f)
-        for part in f:
-            newItem = ITEM(part.strip().split()[0], int(part.strip().split()[1]))
-            items.append(newItem)
+        return parse_items(f)
+
+
+def parse_boxes(first_line):
+    """
+    makes the empty boxes from the first line of a manifest
+    :param first_line: the line of box capacities separated by spaces
+    :return: the list of boxes
+    """
+    return [BOX(int(part), []) for part in first_line.split()]
+
+
+def parse_items(lines):
+    """
+    streams item lines of the form "<name> <weight>" into an ITEM_STORE, splitting each line once
+    blank lines are skipped
+    :param lines: any iterable of lines, such as an open file
+    :return: the ITEM_STORE of the items
+    """
+    # weights are 64 bit like in numpy_packing, so weights over 2 ** 31 fit
+    items = ITEM_STORE([], {}, array('i'), array('q'))
+    add = items.add
+    for line in lines:
+        parts = line.split()
+        if parts:
+            add(parts[0], int(parts[1]))
     return items
 
 
@@ -88,12 +270,8 @@ def sort_items(items):
     :param items: the initial items list to be sorted
     :return: the sorted items list
     """
-    if items == []:
-        return []
-    else:
-        pivot = items[0].weight
-        (less, same, more) = partition_items(pivot, items)
-        return sort_items(less) + same + sort_items(more)
+    # sorted is a stable, non-recursive O(n log n) sort, so equal weights keep their file order
+    return sorted(items, key=attrgetter("weight"), reverse=True)
 
 
 def sort_boxes(boxes):
@@ -104,12 +282,7 @@ def sort_boxes(boxes):
     :param boxes: the boxes list to be sorted
     :return: the sorted boxes list
     """
-    if boxes == []:
-        return []
-    else:
-        pivot = boxes[0].capacity
-        (less, same, more) = partition_boxes(pivot, boxes)
-        return sort_boxes(less) + same + sort_boxes(more)
+    return sorted(boxes, key=attrgetter("capacity"))
 
 
 def roomiest(items, boxes):
@@ -117,32 +290,12 @@ def roomiest(items, boxes):
     iterates through the items and places the item in the box with the greatest remaining allowed weight
     pre-condition: items and boxes are passed in, boxes are empty
     and all have capacity > than 0, items is sorted
-    post-condition: boxes are filled and tell if either all items are packed or not
+    post-condition: boxes are filled and the result tells which items went where
     :param items: the items being sorted in to the boxes
-    :param boxes: the boxes being filled, each with a set capacity
-    :return N/A
+    :param boxes: the boxes being filled, each with a set capacity. any number of boxes can be given
+    :return: a PACKING with the assignments, unpacked items and remaining capacities
     """
-    for item in items:
-        largest_box = boxes[0]
-        for box in boxes:
-            if box.capacity > largest_box.capacity:
-                largest_box = box
-        if item.weight <= largest_box.capacity:
-            largest_box.items.append(item)
-            largest_box.capacity -= item.weight
-    print("Box 1 of weight 12 capacity contains")
-    for i in boxes[0].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    print("Box 2 of weight 12 capacity contains")
-    for i in boxes[1].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    print("Box 3 of weight 12 capacity contains")
-    for i in boxes[2].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    if boxes[0].capacity + boxes[1].capacity + boxes[2].capacity == 0:
-        print("Successfully able to pack all items")
-    else:
-        print("Unable to pack all items")
+    return fill_boxes(items, boxes, roomiest_positions)
 
 
 def tightest_fit(items, boxes):
@@ -151,31 +304,12 @@ def tightest_fit(items, boxes):
         that will fit the item
         pre-condition: items and boxes are passed in, boxes are empty
         and all have capacity > than 0, items is sorted
-        post-condition: boxes are filled and tell if either all items are packed or not
+        post-condition: boxes are filled and the result tells which items went where
         :param items: the items being sorted in to the boxes
-        :param boxes: the boxes being filled, each with a set capacity
-        :return N/A
+        :param boxes: the boxes being filled, each with a set capacity. any number of boxes can be given
+        :return: a PACKING with the assignments, unpacked items and remaining capacities
     """
-    for item in items:
-        boxes = sort_boxes(boxes)
-        for box in boxes:
-            if item.weight <= box.capacity:
-                box.items.append(item)
-                box.capacity -= item.weight
-                break
-    print("Box 1 of weight 12 capacity contains")
-    for i in boxes[0].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    print("Box 2 of weight 12 capacity contains")
-    for i in boxes[1].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    print("Box 3 of weight 12 capacity contains")
-    for i in boxes[2].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    if boxes[0].capacity + boxes[1].capacity + boxes[2].capacity == 0:
-        print("Successfully able to pack all items")
-    else:
-        print("Unable to pack all items")
+    return fill_boxes(items, boxes, tightest_fit_positions)
 
 
 def one_at_a_time(items, boxes):
@@ -184,76 +318,349 @@ def one_at_a_time(items, boxes):
         if it fits, it will be placed in, even if that placement is not optimal
         pre-condition: items and boxes are passed in, boxes are empty
         and all have capacity > than 0, items is sorted
-        post-condition: boxes are filled and tell if either all items are packed or not
+        post-condition: boxes are filled and the result tells which items went where
         :param items: the items being sorted in to the boxes
-        :param boxes: the boxes being filled, each with a set capacity
-        :return N/A
+        :param boxes: the boxes being filled, each with a set capacity. any number of boxes can be given
+        :return: a PACKING with the assignments, unpacked items and remaining capacities
     """
-    for item in items:
-        if item.weight <= boxes[0].capacity:
-            boxes[0].items.append(item)
-            boxes[0].capacity -= item.weight
-        elif item.weight <= boxes[1].capacity:
-            boxes[1].items.append(item)
-            boxes[1].capacity -= item.weight
-        elif item.weight <= boxes[2].capacity:
-            boxes[2].items.append(item)
-            boxes[2].capacity -= item.weight
-    print("Box 1 of weight 12 capacity contains")
-    for i in boxes[0].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    print("Box 2 of weight 12 capacity contains")
-    for i in boxes[1].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    print("Box 3 of weight 12 capacity contains")
-    for i in boxes[2].items:
-        print(str(i.name) + " of weight " + str(i.weight))
-    if boxes[0].capacity + boxes[1].capacity + boxes[2].capacity == 0:
-        print("Successfully able to pack all items")
-    else:
-        print("Unable to pack all items")
+    return fill_boxes(items, boxes, one_at_a_time_positions)
 
 
-def partition_items(pivot, items):
+def fill_boxes(items, boxes, kernel):
     """
-    partition: A * List( A ) -> Tuple( List( A ), List( A ), List( A ) )
-        where A is totally ordered
-    pre-condition: a pivot is selected and passed in and items is passed in as an unsorted list of data classes
-    post-condition: pivot was used to sort the list around itself and items is now sort by decreasing weight
-    :param pivot: the middle term being used to pivot the sorting lists around
-    :param items: the items being sorted
-    :return: less than list, same as pivot value list, and more than list
+    runs a strategy kernel on the item weights and box capacities, then puts the items in the boxes it picked
+    pre-condition: items and boxes are passed in, items is sorted
+    post-condition: boxes are filled and have their remaining capacity
+    :param items: the items being sorted in to the boxes
+    :param boxes: the boxes being filled
+    :param kernel: one of the _positions functions
+    :return: a PACKING with the assignments, unpacked items and remaining capacities
+    """
+    capacities = [box.capacity for box in boxes]
+    positions = kernel([item.weight for item in items], capacities)
+    assignments = []
+    unpacked = []
+    for item, position in zip(items, positions):
+        if position < 0:
+            unpacked.append(item)
+        else:
+            boxes[position].items.append(item)
+            assignments.append((item, position))
+    for box, capacity in zip(boxes, capacities):
+        box.capacity = capacity
+    return PACKING(assignments, unpacked, capacities)
+
+
+def roomiest_positions(weights, capacities):
+    """
+    the roomiest strategy on plain numbers: each weight goes in the box with the most capacity left
+    pre-condition: weights is sorted
+    post-condition: capacities holds what is left in each box
+    :param weights: the item weights
+    :param capacities: the capacity of each box, changed in place
+    :return: array of the box position for each weight, -1 where it did not fit
+    """
+    positions = array('i')
+    # max-heap of (-capacity, position) so ties go to the earliest box, same as a left to right scan
+    heap = [(-capacity, position) for position, capacity in enumerate(capacities)]
+    heapq.heapify(heap)
+    for weight in weights:
+        if heap and weight <= -heap[0][0]:
+            position = heap[0][1]
+            capacities[position] -= weight
+            heapq.heapreplace(heap, (-capacities[position], position))
+            positions.append(position)
+        else:
+            positions.append(-1)
+    return positions
+
+
+def tightest_fit_positions(weights, capacities):
+    """
+    the tightest_fit strategy on plain numbers: each weight goes in the box with the least capacity left that fits
+    pre-condition: weights is sorted
+    post-condition: capacities holds what is left in each box
+    :param weights: the item weights
+    :param capacities: the capacity of each box, changed in place
+    :return: array of the box position for each weight, -1 where it did not fit
+    """
+    positions = array('i')
+    # sorted index of (capacity, arrival, position). a box that shrinks goes behind the boxes that
+    # already had its new capacity, which is the tie order re-sorting the boxes after every item gave
+    index = SORTED_KEYS((capacity, position, position) for position, capacity in enumerate(capacities))
+    arrival = len(capacities)
+    for weight in weights:
+        key = index.first_at_least((weight,))
+        if key is not None:
+            position = key[2]
+            capacities[position] -= weight
+            if weight != 0:
+                index.remove(key)
+                index.add((capacities[position], arrival, position))
+                arrival += 1
+            positions.append(position)
+        else:
+            positions.append(-1)
+    return positions
+
+
+def one_at_a_time_positions(weights, capacities):
+    """
+    the one_at_a_time strategy on plain numbers: each weight goes in the first box that fits
+    pre-condition: weights is sorted
+    post-condition: capacities holds what is left in each box
+    :param weights: the item weights
+    :param capacities: the capacity of each box, changed in place
+    :return: array of the box position for each weight, -1 where it did not fit
     """
-    (less, same, more) = ([], [], [])
-    for i in items:
-        if i.weight < pivot:
-            more.append(i)
-        elif i.weight > pivot:
-            less.append(i)
+    positions = array('i')
+    for weight in weights:
+        for position, capacity in enumerate(capacities):
+            if weight <= capacity:
+                capacities[position] = capacity - weight
+                positions.append(position)
+                break
         else:
-            same.append(i)
-    return less, same, more
-
-
-def partition_boxes(pivot, boxes):
-    """
-    partition: A * List( A ) -> Tuple( List( A ), List( A ), List( A ) )
-        where A is totally ordered
-    pre-condition: a pivot is selected and passed in and items is passed in as an unsorted list of data classes
-    post-condition: pivot was used to sort the list around itself and items is now sort by decreasing weight
-    :param pivot: the middle term being used to pivot the sorting lists around
-    :param boxes: the items being sorted
-    :return: less than list, same as pivot value list, and more than list
-    """
-    (less, same, more) = ([], [], [])
-    for i in boxes:
-        if i.capacity < pivot:
-            less.append(i)
-        elif i.capacity > pivot:
-            more.append(i)
+            positions.append(-1)
+    return positions
+
+
+def pack_store(items, capacities, strategy_name, kernels=None):
+    """
+    packs an ITEM_STORE without making an ITEM or BOX object per item
+    pre-condition: items is an ITEM_STORE, it does not need to be sorted
+    post-condition: nothing is changed
+    :param items: the ITEM_STORE
+    :param capacities: the capacity of each box
+    :param strategy_name: the name of the strategy in kernels
+    :param kernels: the kernels to use, KERNELS by default or numpy_packing.NUMPY_KERNELS
+    :return: a STORE_PACKING holding each box's contents as a range of item ids
+    """
+    weights = items.weights
+    # same order as sort_items: heaviest first, file order for equal weights
+    order = sorted(range(len(weights)), key=weights.__getitem__, reverse=True)
+    remaining = list(capacities)
+    if kernels is None:
+        kernels = KERNELS
+    positions = kernels[strategy_name]([weights[item_id] for item_id in order], remaining)
+    # counting sort of the packed ids by box, so box b holds contents[starts[b]:starts[b + 1]]
+    starts = array('i', [0] * (len(capacities) + 1))
+    for position in positions:
+        if position >= 0:
+            starts[position + 1] += 1
+    for position in range(len(capacities)):
+        starts[position + 1] += starts[position]
+    contents = array('i', [0] * starts[-1])
+    unpacked = array('i')
+    fill = array('i', starts[:-1])
+    for item_id, position in zip(order, positions):
+        if position < 0:
+            unpacked.append(item_id)
+        else:
+            contents[fill[position]] = item_id
+            fill[position] += 1
+    return STORE_PACKING(starts, contents, unpacked, array('q', remaining))
+
+
+def report(boxes, result):
+    """
+    prints what each box holds and whether every item was packed
+    pre-condition: boxes were filled by one of the strategies, which gave back result
+    post-condition: the contents of every box and the packing outcome are printed
+    :param boxes: the filled boxes, in the order they were made
+    :param result: the PACKING the strategy returned
+    :return N/A
+    """
+    for number, box in enumerate(boxes, 1):
+        capacity = box.capacity + sum(item.weight for item in box.items)
+        print("Box " + str(number) + " of weight " + str(capacity) + " capacity contains")
+        for i in box.items:
+            print(str(i.name) + " of weight " + str(i.weight))
+    if result.unpacked:
+        print("Unable to pack all items")
+    else:
+        print("Successfully able to pack all items")
+
+
+def exact(items, boxes, time_budget=5.0):
+    """
+    packs the items exactly: if any packing of every item exists, it is found
+    the greedy strategies are tried first, and the search only runs when none of them packs every item.
+    if the search proves there is no packing, or the time budget runs out, the best greedy packing is used
+    pre-condition: items and boxes are passed in, boxes are empty, items is sorted
+    post-condition: boxes are filled and the status tells how the packing was found
+    :param items: the items being sorted in to the boxes
+    :param boxes: the boxes being filled, each with a set capacity
+    :param time_budget: the most seconds the search may take
+    :return: tuple of the PACKING and a status, which is "greedy", "packed", "infeasible" or "timeout"
+    """
+    capacities = [box.capacity for box in boxes]
+    best = None
+    for strategy in STRATEGIES.values():
+        trial = strategy(items, [BOX(capacity, []) for capacity in capacities])
+        if best is None or len(trial.unpacked) < len(best.unpacked):
+            best = trial
+    if not best.unpacked:
+        status = "greedy"
+        assignments = best.assignments
+        unpacked = []
+    else:
+        placement, status = search_packing([item.weight for item in items], capacities, time_budget)
+        if placement is not None:
+            assignments = list(zip(items, placement))
+            unpacked = []
         else:
-            same.append(i)
-    return less, same, more
+            assignments = best.assignments
+            unpacked = best.unpacked
+    for item, position in assignments:
+        boxes[position].items.append(item)
+        boxes[position].capacity -= item.weight
+    return PACKING(assignments, unpacked, [box.capacity for box in boxes]), status
+
+
+def search_packing(weights, capacities, time_budget):
+    """
+    branch and bound search for a box for every weight, used by exact
+    each weight tries the boxes from tightest to roomiest. boxes with the same remaining capacity are
+    interchangeable, so only one of them is tried (this breaks the symmetry between identical boxes).
+    a branch is cut when the remaining weight is more than the capacity left in the boxes that can still
+    take the smallest remaining weight, or when its (weight index, sorted remaining capacities) state has
+    already been searched and failed.
+    pre-condition: weights are sorted from largest to smallest
+    :param weights: the item weights
+    :param capacities: the capacity of each box
+    :param time_budget: the most seconds the search may take
+    :return: tuple of (the box position for each weight, "packed"), or (None, "infeasible") or (None, "timeout")
+    """
+    count = len(weights)
+    if count == 0:
+        return [], "packed"
+    residual = list(capacities)
+    # remaining[i] and smallest[i] are the total and the smallest of weights[i:]
+    remaining = [0] * (count + 1)
+    smallest = [0] * (count + 1)
+    smallest[count - 1] = weights[count - 1]
+    for i in range(count - 1, -1, -1):
+        remaining[i] = remaining[i + 1] + weights[i]
+        if i < count - 1:
+            smallest[i] = min(weights[i], smallest[i + 1])
+    failed = set()
+    deadline = time.perf_counter() + time_budget
+    nodes = 0
+
+    def enter(i):
+        """
+        gives the boxes to try for weights[i], or None when the branch can be cut
+        """
+        state = (i, tuple(sorted(residual)))
+        if state in failed:
+            return None, state
+        usable = sum(capacity for capacity in residual if capacity >= smallest[i])
+        if remaining[i] > usable:
+            failed.add(state)
+            return None, state
+        seen = set()
+        options = []
+        for position in sorted(range(len(residual)), key=residual.__getitem__):
+            capacity = residual[position]
+            if capacity >= weights[i] and capacity not in seen:
+                seen.add(capacity)
+                options.append(position)
+        return iter(options), state
+
+    placed = []
+    options, state = enter(0)
+    if options is None:
+        return None, "infeasible"
+    levels = [(options, state)]
+    while levels:
+        i = len(levels) - 1
+        if len(placed) > i:
+            residual[placed.pop()] += weights[i]
+        options, state = levels[i]
+        position = next(options, None)
+        if position is None:
+            failed.add(state)
+            levels.pop()
+            continue
+        residual[position] -= weights[i]
+        placed.append(position)
+        if i + 1 == count:
+            return placed, "packed"
+        nodes += 1
+        if nodes % 1024 == 0 and time.perf_counter() > deadline:
+            return None, "timeout"
+        options, state = enter(i + 1)
+        if options is not None:
+            levels.append((options, state))
+    return None, "infeasible"
+
+
+def pack_job(strategy_name, capacities, items):
+    """
+    runs one strategy on fresh boxes. this is the unit of work handed to the process pool in run_batch
+    pre-condition: items are already sorted
+    post-condition: the strategy has packed a new set of boxes, nothing is printed
+    :param strategy_name: the name of the strategy in STRATEGIES
+    :param capacities: the capacity of each box
+    :param items: the sorted items
+    :return: tuple of (packed count, unpacked count, remaining capacity, seconds to pack)
+    """
+    boxes = [BOX(capacity, []) for capacity in capacities]
+    start = time.perf_counter()
+    result = STRATEGIES[strategy_name](items, boxes)
+    seconds = time.perf_counter() - start
+    return len(result.assignments), len(result.unpacked), sum(result.remaining), seconds
+
+
+def find_manifests(pattern):
+    """
+    finds the manifest files to run in batch mode
+    :param pattern: a directory, which is searched for items*.txt files, or a glob pattern
+    :return: the sorted list of file paths
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "items*.txt")
+    return sorted(glob.glob(pattern))
+
+
+def run_batch(pattern, summary_file=None, workers=None):
+    """
+    packs every manifest matching pattern with every strategy and writes a summary table
+    each file is parsed and sorted once, then the (file, strategy) jobs are spread across a process pool
+    pre-condition: pattern names a directory or glob of manifest files
+    post-condition: the summary table is written to summary_file, or printed if there is none
+    :param pattern: a directory of items*.txt files or a glob pattern
+    :param summary_file: the file to write the summary table to
+    :param workers: the number of worker processes, the default is one per cpu
+    :return: the list of summary rows
+    """
+    jobs = []
+    with ProcessPoolExecutor(workers) as pool:
+        for filename in find_manifests(pattern):
+            start = time.perf_counter()
+            boxes, initial_items = make_boxes_and_items(filename)
+            items = sort_items(initial_items)
+            load_seconds = time.perf_counter() - start
+            capacities = [box.capacity for box in boxes]
+            for strategy_name in STRATEGIES:
+                future = pool.submit(pack_job, strategy_name, capacities, items)
+                jobs.append((filename, strategy_name, len(boxes), len(items), load_seconds, future))
+        rows = [(filename, strategy_name, num_boxes, num_items, load_seconds) + future.result()
+                for filename, strategy_name, num_boxes, num_items, load_seconds, future in jobs]
+    lines = ["{:<30} {:<14} {:>7} {:>9} {:>9} {:>9} {:>10} {:>10} {:>10}".format(
+        "file", "strategy", "boxes", "items", "packed", "unpacked", "remaining", "load_s", "pack_s")]
+    for filename, strategy_name, num_boxes, num_items, load_seconds, packed, unpacked, remaining, seconds in rows:
+        lines.append("{:<30} {:<14} {:>7} {:>9} {:>9} {:>9} {:>10} {:>10.4f} {:>10.4f}".format(
+            os.path.basename(filename), strategy_name, num_boxes, num_items, packed, unpacked, remaining,
+            load_seconds, seconds))
+    table = "\n".join(lines)
+    if summary_file is None:
+        print(table)
+    else:
+        with open(summary_file, "w") as f:
+            f.write(table + "\n")
+    return rows
 
 
 def main():
@@ -263,8 +670,12 @@ def main():
         pre-condition: file is an empty input file
         post-condition: file is a text file and has been inputted by the user and the results from each strategy have
         been printed
+        with command line arguments it runs batch mode instead: moving.py <directory or glob> [summary file]
         :return N/A
     """
+    if len(sys.argv) > 1:
+        run_batch(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+        return
     file = input("Enter data filename: ")
     print("results from greedy strategy 1")
     run_roomiest(file)
@@ -274,45 +685,87 @@ def main():
     print()
     print("results from greedy strategy 3")
     run_one_at_a_time(file)
+    print()
+    print("results from exact solver")
+    run_exact(file)
 
 
 def run_one_at_a_time(filename):
     """
         creates a copy of the boxes and sorted items and then tests our desired file items on one_at_a_time()
         pre-condition: file is passed in, boxes are make and items sorted
-        post-condition: one_at_a_time is ran and the boxes are filled accordingly with items
+        post-condition: one_at_a_time is ran, the boxes are filled accordingly with items and printed
         :param filename: the text file being read off of to make items and boxes
-        :return: N/A
+        :return: the PACKING from one_at_a_time
     """
     boxes, initial_items = make_boxes_and_items(filename)
     items = sort_items(initial_items)
-    one_at_a_time(items, boxes)
+    result = one_at_a_time(items, boxes)
+    report(boxes, result)
+    return result
 
 
 def run_tightest_fit(filename):
     """
         creates a copy of the boxes and sorted items and then tests our desired file items on tightest_fit()
         pre-condition: file is passed in, boxes are make and items sorted
-        post-condition: tightest_fit is ran and the boxes are filled accordingly with items
+        post-condition: tightest_fit is ran, the boxes are filled accordingly with items and printed
         :param filename: the text file being read off of to make items and boxes
-        :return: N/A
+        :return: the PACKING from tightest_fit
     """
     boxes, initial_items = make_boxes_and_items(filename)
     items = sort_items(initial_items)
-    tightest_fit(items, boxes)
+    result = tightest_fit(items, boxes)
+    report(boxes, result)
+    return result
 
 
 def run_roomiest(filename):
     """
         creates a copy of the boxes and sorted items and then tests our desired file items on roomiest()
         pre-condition: file is passed in, boxes are make and items sorted
-        post-condition: roomiest is ran and the boxes are filled accordingly with items
+        post-condition: roomiest is ran, the boxes are filled accordingly with items and printed
+        :param filename: the text file being read off of to make items and boxes
+        :return: the PACKING from roomiest
+    """
+    boxes, initial_items = make_boxes_and_items(filename)
+    items = sort_items(initial_items)
+    result = roomiest(items, boxes)
+    report(boxes, result)
+    return result
+
+
+def run_exact(filename):
+    """
+        creates a copy of the boxes and sorted items and then tests our desired file items on exact()
+        pre-condition: file is passed in, boxes are make and items sorted
+        post-condition: exact is ran, the boxes are filled accordingly with items and printed
         :param filename: the text file being read off of to make items and boxes
-        :return: N/A
+        :return: the PACKING from exact
     """
     boxes, initial_items = make_boxes_and_items(filename)
     items = sort_items(initial_items)
-    roomiest(items, boxes)
+    result, status = exact(items, boxes)
+    report(boxes, result)
+    if status == "infeasible":
+        print("No packing of all items exists")
+    elif status == "timeout":
+        print("Time ran out before a packing was found, showing the best greedy packing")
+    return result
+
+
+STRATEGIES = {
+    "roomiest": roomiest,
+    "tightest_fit": tightest_fit,
+    "one_at_a_time": one_at_a_time,
+}
+
+
+KERNELS = {
+    "roomiest": roomiest_positions,
+    "tightest_fit": tightest_fit_positions,
+    "one_at_a_time": one_at_a_time_positions,
+}
 
 
 if __name__ == '__main__':
@@ -0,0 +1,90 @@
+"""
+Author:Isaac McKinney
+numpy_packing.py
+
+An optional NumPy engine for the greedy strategies in moving.py.
+The box capacities are held in an ndarray and each item is placed with one vectorized search over the boxes.
+pack_batch runs many independent manifests at once as the rows of a 2-D array.
+The pure Python kernels in moving.py are the reference, and these give the same box for every item.
+"""
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # the engine is optional, moving.py works without it
+    np = None
+
+
+def pack_batch(strategy_name, weights, capacities):
+    """
+    packs many manifests at once, one manifest per row
+    roomiest uses argmax over the capacities, tightest_fit a masked argmin over the boxes the item fits in,
+    and one_at_a_time the first box the item fits in
+    pre-condition: each row of weights is sorted, rows shorter than the others are padded with -1
+    :param strategy_name: "roomiest", "tightest_fit" or "one_at_a_time"
+    :param weights: 2-D array-like of item weights, one row per manifest
+    :param capacities: 2-D array-like of box capacities, one row per manifest
+    :return: tuple of (2-D int array of box positions, -1 where an item did not fit or is padding,
+             2-D int array of the remaining capacities)
+    """
+    if np is None:
+        raise ImportError("numpy is needed for the numpy packing engine")
+    if strategy_name not in ("roomiest", "tightest_fit", "one_at_a_time"):
+        raise ValueError("unknown strategy " + str(strategy_name))
+    weights = np.array(weights, dtype=np.int64, ndmin=2)
+    capacities = np.array(capacities, dtype=np.int64, ndmin=2)
+    num_rows, num_items = weights.shape
+    num_boxes = capacities.shape[1]
+    positions = np.full((num_rows, num_items), -1, dtype=np.int64)
+    if num_boxes == 0:
+        return positions, capacities
+    rows = np.arange(num_rows)
+    # tightest_fit breaks ties by when a box last shrank, like the bisect index in moving.py.
+    # boxes start in file order and a box that shrinks at item j gets arrival num_boxes + j.
+    arrival = np.tile(np.arange(num_boxes, dtype=np.int64), (num_rows, 1))
+    spread = num_boxes + num_items + 1
+    never = np.iinfo(np.int64).max
+    for j in range(num_items):
+        weight = weights[:, j]
+        real = weight >= 0
+        if strategy_name == "roomiest":
+            position = capacities.argmax(axis=1)
+            fits = real & (weight <= capacities[rows, position])
+        elif strategy_name == "tightest_fit":
+            feasible = capacities >= weight[:, None]
+            key = np.where(feasible, capacities * spread + arrival, never)
+            position = key.argmin(axis=1)
+            fits = real & feasible[rows, position]
+        else:
+            feasible = capacities >= weight[:, None]
+            position = feasible.argmax(axis=1)
+            fits = real & feasible[rows, position]
+        placed_rows = rows[fits]
+        placed_boxes = position[fits]
+        capacities[placed_rows, placed_boxes] -= weight[fits]
+        if strategy_name == "tightest_fit":
+            moved = fits & (weight != 0)
+            arrival[rows[moved], position[moved]] = num_boxes + j
+        positions[placed_rows, j] = placed_boxes
+    return positions, capacities
+
+
+def make_kernel(strategy_name):
+    """
+    makes a kernel with the same signature as the ones in moving.KERNELS, backed by pack_batch
+    :param strategy_name: "roomiest", "tightest_fit" or "one_at_a_time"
+    :return: function (weights, capacities) -> array of box positions, that changes capacities in place
+    """
+    def kernel(weights, capacities):
+        positions, remaining = pack_batch(strategy_name, [list(weights)], [list(capacities)])
+        capacities[:] = remaining[0].tolist()
+        return array('i', positions[0].tolist())
+    kernel.__name__ = strategy_name + "_numpy_positions"
+    return kernel
+
+
+NUMPY_KERNELS = {
+    "roomiest": make_kernel("roomiest"),
+    "tightest_fit": make_kernel("tightest_fit"),
+    "one_at_a_time": make_kernel("one_at_a_time"),
+}
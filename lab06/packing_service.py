@@ -0,0 +1,264 @@
+"""
+Author:Isaac McKinney
+packing_service.py
+
+A long running packer for moving.py. The boxes are loaded once and then items can be added, removed and
+repacked one at a time with the tightest_fit or roomiest policy, without packing everything again.
+Commands are read one per line from stdin, or from clients of a local TCP server.
+"""
+import asyncio
+import sys
+
+from moving import BOX, ITEM, SORTED_KEYS, make_boxes_and_items, sort_items
+
+
+class PACKER:
+    """
+    keeps a set of boxes packed as items come and go
+    boxes: the boxes, where each box's items is a dict of item id to ITEM
+    policy: "tightest_fit" or "roomiest"
+    items: maps each item id to (ITEM, box position), where the position is None if the item did not fit
+    the boxes are kept in a SORTED_KEYS index, so finding, removing and re-adding a box costs
+    O(log boxes + BLOCK_SIZE)
+    """
+
+    def __init__(self, capacities, policy="tightest_fit"):
+        """
+        makes empty boxes with the given capacities
+        :param capacities: the capacity of each box
+        :param policy: "tightest_fit" or "roomiest"
+        """
+        if policy not in ("tightest_fit", "roomiest"):
+            raise ValueError("unknown policy " + str(policy))
+        self.boxes = [BOX(capacity, {}) for capacity in capacities]
+        self.policy = policy
+        self.items = {}
+        self.next_id = 0
+        # arrival orders tightest_fit ties the same way tightest_fit in moving.py does
+        self.arrival = 0
+        self.keys = [self.make_key(position) for position in range(len(self.boxes))]
+        self.index = SORTED_KEYS(self.keys)
+
+    def make_key(self, position):
+        """
+        makes the index key for a box from its current capacity
+        :param position: the box position
+        :return: the key, the box position is always its last part
+        """
+        if self.policy == "roomiest":
+            return -self.boxes[position].capacity, position
+        self.arrival += 1
+        return self.boxes[position].capacity, self.arrival, position
+
+    def find_box(self, weight):
+        """
+        finds the box the policy would put an item of this weight in
+        :param weight: the item weight
+        :return: the box position, or None if no box can take it
+        """
+        if self.policy == "roomiest":
+            key = self.index.first()
+            if key is not None and weight <= -key[0]:
+                return key[1]
+            return None
+        key = self.index.first_at_least((weight,))
+        if key is not None:
+            return key[-1]
+        return None
+
+    def change_capacity(self, position, amount):
+        """
+        changes a box's capacity and moves it to its new place in the index
+        :param position: the box position
+        :param amount: how much to add to the capacity, negative to take away
+        :return N/A
+        """
+        if amount == 0:
+            return
+        self.index.remove(self.keys[position])
+        self.boxes[position].capacity += amount
+        self.keys[position] = self.make_key(position)
+        self.index.add(self.keys[position])
+
+    def place(self, item_id, item):
+        """
+        puts an item in the box the policy picks
+        :param item_id: the item's id
+        :param item: the ITEM
+        :return: the box position, or None if it did not fit
+        """
+        position = self.find_box(item.weight)
+        if position is not None:
+            self.boxes[position].items[item_id] = item
+            self.change_capacity(position, -item.weight)
+        self.items[item_id] = (item, position)
+        return position
+
+    def add_item(self, name, weight):
+        """
+        packs a new item
+        a negative weight would give its box capacity back, so it raises ValueError
+        :param name: name of item
+        :param weight: weight of item
+        :return: tuple of the new item id and the box position, which is None if it did not fit
+        """
+        if weight < 0:
+            raise ValueError("negative weight " + str(weight))
+        item_id = self.next_id
+        self.next_id += 1
+        return item_id, self.place(item_id, ITEM(name, weight))
+
+    def remove_item(self, item_id):
+        """
+        takes an item out of its box and forgets it
+        items that did not fit are not retried when capacity frees up, they can be removed and added again
+        :param item_id: the id add_item gave the item
+        :return: the removed ITEM
+        """
+        item, position = self.items.pop(item_id)
+        if position is not None:
+            del self.boxes[position].items[item_id]
+            self.change_capacity(position, item.weight)
+        return item
+
+    def repack_box(self, position):
+        """
+        empties one box and packs its items again, heaviest first, with the policy
+        items may move to other boxes, and the emptied box can take them back
+        :param position: the box position
+        :return: list of (item id, new box position) pairs
+        """
+        box = self.boxes[position]
+        moved = sorted(box.items.items(), key=lambda pair: pair[1].weight, reverse=True)
+        box.items = {}
+        self.change_capacity(position, sum(item.weight for _, item in moved))
+        return [(item_id, self.place(item_id, item)) for item_id, item in moved]
+
+    def unpacked(self):
+        """
+        :return: list of (item id, ITEM) pairs for the items that did not fit
+        """
+        return [(item_id, item) for item_id, (item, position) in self.items.items() if position is None]
+
+
+def load_packer(filename, policy="tightest_fit"):
+    """
+    makes a PACKER from a manifest and packs its items heaviest first, like the run_ functions in moving.py
+    :param filename: the manifest file
+    :param policy: "tightest_fit" or "roomiest"
+    :return: the PACKER
+    """
+    boxes, items = make_boxes_and_items(filename)
+    packer = PACKER([box.capacity for box in boxes], policy)
+    for item in sort_items(items):
+        packer.add_item(item.name, item.weight)
+    return packer
+
+
+def handle_command(packer, line):
+    """
+    runs one command against the packer
+    commands: add <name> <weight>, remove <id>, repack <box>, show, help
+    boxes are numbered from 1 like in the moving.py report
+    :param packer: the PACKER
+    :param line: the command line
+    :return: the reply text
+    """
+    parts = line.split()
+    if not parts:
+        return ""
+    action = parts[0]
+    try:
+        if action == "add" and len(parts) == 3:
+            item_id, position = packer.add_item(parts[1], int(parts[2]))
+            if position is None:
+                return "item " + str(item_id) + " does not fit"
+            return "item " + str(item_id) + " in box " + str(position + 1)
+        if action == "remove" and len(parts) == 2:
+            item = packer.remove_item(int(parts[1]))
+            return "removed " + str(item.name) + " of weight " + str(item.weight)
+        if action == "repack" and len(parts) == 2:
+            number = int(parts[1])
+            if number < 1:
+                raise IndexError
+            moves = packer.repack_box(number - 1)
+            return "\n".join("item " + str(item_id) + " in box " + str(position + 1)
+                             if position is not None else "item " + str(item_id) + " does not fit"
+                             for item_id, position in moves)
+        if action == "show" and len(parts) == 1:
+            lines = []
+            for number, box in enumerate(packer.boxes, 1):
+                lines.append("Box " + str(number) + " has " + str(box.capacity) + " capacity left and contains")
+                for item_id, item in box.items.items():
+                    lines.append(str(item_id) + ": " + str(item.name) + " of weight " + str(item.weight))
+            for item_id, item in packer.unpacked():
+                lines.append("unpacked " + str(item_id) + ": " + str(item.name) + " of weight " + str(item.weight))
+            return "\n".join(lines)
+        if action == "help":
+            return "add <name> <weight>\nremove <id>\nrepack <box>\nshow\nquit"
+    except (ValueError, KeyError, IndexError):
+        return "Illegal Command Use or Form"
+    return "Illegal Command Name: Command doesn't exist"
+
+
+async def serve_stdin(packer):
+    """
+    answers commands typed on stdin until quit or end of input
+    :param packer: the PACKER
+    :return N/A
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if line == "" or line.strip() == "quit":
+            return
+        reply = handle_command(packer, line)
+        if reply:
+            print(reply, flush=True)
+
+
+async def serve_tcp(packer, port, host="127.0.0.1"):
+    """
+    answers commands from any number of local TCP clients, one command per line, sharing one packer
+    a client's quit closes its own connection
+    :param packer: the PACKER
+    :param port: the port to listen on
+    :param host: the address to listen on, local only by default
+    :return N/A
+    """
+    async def client(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line or line.strip() == b"quit":
+                break
+            reply = handle_command(packer, line.decode())
+            if reply:
+                writer.write(reply.encode() + b"\n")
+                await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    server = await asyncio.start_server(client, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """
+    usage: packing_service.py <manifest> [tightest_fit|roomiest] [port]
+    without a port, commands are read from stdin
+    :return N/A
+    """
+    if len(sys.argv) < 2:
+        print("usage: packing_service.py <manifest> [tightest_fit|roomiest] [port]")
+        return
+    policy = sys.argv[2] if len(sys.argv) > 2 else "tightest_fit"
+    packer = load_packer(sys.argv[1], policy)
+    if len(sys.argv) > 3:
+        asyncio.run(serve_tcp(packer, int(sys.argv[3])))
+    else:
+        asyncio.run(serve_stdin(packer))
+
+
+if __name__ == '__main__':
+    main()
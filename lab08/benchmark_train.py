@@ -0,0 +1,453 @@
+"""
+file: benchmark_train.py
+By: Isaac McKinney
+
+Times the train yard commands in command_list.py on generated trains
+"""
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from command_list import *
+from train_run import run_script
+import journal
+
+
+"""
+    the old train car, with a __dict__ and miles kept as the text it was given. kept to compare against
+"""
+@dataclass(frozen=False)
+class OLD_TRAIN_CAR:
+    contents: str
+    destination: str
+    miles: str
+    next: object = None
+
+
+def old_add_car(content, place, distance, train):
+    """
+        the old add_car, which walks the linked list from the head. kept to compare against
+        :param content: train car contents
+        :param place: the place for the contents to be delivered to
+        :param distance: the total distance needed to travel to reach the place for drop-off
+        :param train: the linked list being manipulated
+        :return: the train with a new train car
+    """
+    car = Train_Car(content, place, distance, None)
+    node = train.head
+    if node is None:
+        train.head = car
+    else:
+        successor = node
+        previous = None
+        while successor is not None:
+            if int(successor.miles) < int(car.miles):
+                previous = successor
+                successor = successor.next
+            else:
+                if previous is not None:
+                    previous.next = car
+                else:
+                    train.head = car
+                car.next = successor
+                break
+        if successor is None:
+            previous.next = car
+    train.num_cars += 1
+    return train
+
+
+def bench_add_car(sizes):
+    """
+        builds trains of random miles with the old and the new add_car and prints the times
+        pre-condition: sizes is a list of car counts
+        post-condition: the times are printed and both trains are checked to be in the same order
+        :param sizes: the car counts to try
+        :return: N/A
+    """
+    for size in sizes:
+        rng = random.Random(size)
+        cars = [("car" + str(i), "town" + str(i % 50), str(rng.randint(0, 1000))) for i in range(size)]
+        old_train = Entire_Train(None, 0, 0)
+        began = time.perf_counter()
+        for content, place, distance in cars:
+            old_add_car(content, place, distance, old_train)
+        old_time = time.perf_counter() - began
+        new_train = Entire_Train(None, 0, 0)
+        began = time.perf_counter()
+        for content, place, distance in cars:
+            add_car(content, place, distance, new_train)
+        new_time = time.perf_counter() - began
+        old_node, new_node = old_train.head, new_train.head
+        while old_node is not None:
+            if old_node.contents != new_node.contents:
+                raise AssertionError("add_car built a different train at " + str(size) + " cars")
+            old_node, new_node = old_node.next, new_node.next
+        print("add_car cars=" + str(size) + " old=" + format(old_time, ".4f") + "s new="
+              + format(new_time, ".4f") + "s speedup=" + format(old_time / max(new_time, 1e-9), ".1f") + "x")
+
+
+def bench_add_cars(sizes):
+    """
+        loads batches of random cars with add_cars, both into an empty train and into one that already
+        has as many cars, and prints the times
+        pre-condition: sizes is a list of car counts
+        post-condition: the times are printed
+        :param sizes: the batch sizes to try
+        :return: N/A
+    """
+    for size in sizes:
+        rng = random.Random(size)
+        cars = [("car" + str(i), "town" + str(i % 50), str(rng.randint(0, 1000))) for i in range(size)]
+        train = Entire_Train(None, 0, 0)
+        began = time.perf_counter()
+        add_cars(cars, train)
+        empty_time = time.perf_counter() - began
+        began = time.perf_counter()
+        add_cars(cars, train)
+        full_time = time.perf_counter() - began
+        print("add_cars cars=" + str(size) + " into empty=" + format(empty_time, ".4f") + "s into "
+              + str(size) + " cars=" + format(full_time, ".4f") + "s")
+
+
+def bench_cold_start(size):
+    """
+        records a train of size cars in a journal, then times restoring it from the journal alone and from
+        a snapshot, the way train_run.py --state does on start up
+        pre-condition: size > 0
+        post-condition: the times are printed and the temporary state folder is removed
+        :param size: how many cars the train has
+        :return: N/A
+    """
+    rng = random.Random(size)
+    cars = [("car" + str(i), "town" + str(i % 50), str(rng.randint(0, 1000))) for i in range(size)]
+    folder = tempfile.mkdtemp()
+    try:
+        train = Entire_Train(None, 0, 0)
+        log = journal.open_journal(folder, train)
+        set_speed("60", train)
+        journal.record(log, "set_speed", ["60"], None, train)
+        add_cars(cars, train)
+        journal.record(log, "add_cars", [], cars, train)
+        log.file.close()
+        began = time.perf_counter()
+        restored = Entire_Train(None, 0, 0)
+        journal.restore(folder, restored)
+        replay_time = time.perf_counter() - began
+        log = journal.open_journal(folder, Entire_Train(None, 0, 0))
+        journal.close_journal(log, train)
+        began = time.perf_counter()
+        restored = Entire_Train(None, 0, 0)
+        journal.restore(folder, restored)
+        snapshot_time = time.perf_counter() - began
+        if restored.num_cars != size or restored.speed != 60:
+            raise AssertionError("the snapshot did not restore the train")
+        print("cold start cars=" + str(size) + " journal replay=" + format(replay_time, ".3f")
+              + "s snapshot=" + format(snapshot_time, ".3f") + "s snapshot size="
+              + format(os.path.getsize(os.path.join(folder, "snapshot.bin")) / 1e6, ".1f") + " MB")
+    finally:
+        shutil.rmtree(folder)
+
+
+def car_lines(size, seed):
+    """
+        makes the (content, station, distance) words of size cars, split from lines of text the way
+        add_cars reads them, so every car starts out with its own strings
+        :param size: how many cars to make
+        :param seed: the random seed so runs can be repeated
+        :return: the list of (content, station, distance)
+    """
+    rng = random.Random(seed)
+    goods = ["coal", "wood", "iron", "grain", "oil", "steel", "sand", "cars"]
+    return [tuple((rng.choice(goods) + " town" + str(i % 50) + " " + str(rng.randint(0, 1000))).split())
+            for i in range(size)]
+
+
+def bench_memory(size):
+    """
+        measures with tracemalloc how many bytes each car of a size car train keeps, for the old cars
+        linked straight from the words and for add_cars with slotted cars and the symbol table
+        the words are dropped before measuring, so only what the train holds on to is counted
+        pre-condition: size > 0
+        post-condition: the bytes per car are printed
+        :param size: how many cars the train has
+        :return: N/A
+    """
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    cars = car_lines(size, size)
+    old_cars = [OLD_TRAIN_CAR(content, place, distance, None) for content, place, distance in cars]
+    for previous, car in zip(old_cars, old_cars[1:]):
+        previous.next = car
+    del cars
+    old_bytes = tracemalloc.get_traced_memory()[0] - base
+    del old_cars
+    tracemalloc.stop()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    cars = car_lines(size, size)
+    train = Entire_Train(None, 0, 0)
+    add_cars(cars, train)
+    del cars
+    new_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    print("memory cars=" + str(size) + " old=" + format(old_bytes / size, ".1f") + " bytes/car new="
+          + format(new_bytes / size, ".1f") + " bytes/car (index included)")
+
+
+def make_script(num_lines, seed):
+    """
+        makes a command script that is mostly add_car, with set_speed, train_size, help and a start
+        every 10000 lines so the train keeps getting emptied
+        :param num_lines: how many command lines to make
+        :param seed: the random seed so runs can be repeated
+        :return: the list of command lines
+    """
+    rng = random.Random(seed)
+    lines = ["set_speed 60\n"]
+    while len(lines) < num_lines - 1:
+        if len(lines) % 10000 == 0:
+            lines.append("start\n")
+            continue
+        roll = rng.random()
+        if roll < 0.85:
+            lines.append("add_car car" + str(len(lines)) + " town" + str(rng.randrange(50)) + " "
+                         + str(rng.randint(0, 1000)) + "\n")
+        elif roll < 0.9:
+            lines.append("set_speed " + str(rng.randint(1, 90)) + "\n")
+        elif roll < 0.99:
+            lines.append("train_size\n")
+        else:
+            lines.append("help\n")
+    lines.append("quit\n")
+    return lines
+
+
+def bench_commands(num_lines):
+    """
+        runs a generated script through the command engine and prints the commands per second
+        the output goes to os.devnull so the terminal is not what gets timed
+        pre-condition: num_lines > 1
+        post-condition: the throughput is printed
+        :param num_lines: how many command lines to run
+        :return: N/A
+    """
+    lines = make_script(num_lines, num_lines)
+    train = Entire_Train(None, 0, 0)
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        began = time.perf_counter()
+        run_script(lines, train)
+        seconds = time.perf_counter() - began
+    print("commands lines=" + str(num_lines) + " time=" + format(seconds, ".3f") + "s rate="
+          + format(num_lines / seconds, ".0f") + " commands/s")
+
+
+# how the miles of a generated workload's cars are drawn
+MILE_PATTERNS = ("ascending", "descending", "random", "duplicates")
+
+# the command mixes a workload can have: for each car added, the chance of each other command coming next
+MIXES = {
+    "build": {},
+    "mixed": {"train_size": 0.05, "count_miles": 0.05, "cars_to": 0.02, "show_train": 0.01,
+              "detach": 0.005, "start": 0.0005},
+    "query": {"train_size": 0.2, "count_miles": 0.5, "cars_to": 0.1, "show_train": 0.05},
+}
+
+
+def car_miles(pattern, num_cars, max_miles, rng):
+    """
+        makes the miles of the cars in a workload
+        :param pattern: one of MILE_PATTERNS. "ascending" and "descending" come already in order, so add_car
+        always puts the car at the back or the front, and "duplicates" only uses 10 different distances
+        :param num_cars: how many miles to make
+        :param max_miles: the farthest distance
+        :param rng: the random.Random to draw from
+        :return: the list of miles
+    """
+    if pattern == "ascending":
+        return sorted(rng.randint(0, max_miles) for _ in range(num_cars))
+    if pattern == "descending":
+        return sorted((rng.randint(0, max_miles) for _ in range(num_cars)), reverse=True)
+    if pattern == "random":
+        return [rng.randint(0, max_miles) for _ in range(num_cars)]
+    if pattern == "duplicates":
+        distances = [rng.randint(0, max_miles) for _ in range(10)]
+        return [rng.choice(distances) for _ in range(num_cars)]
+    raise ValueError("unknown mile pattern " + str(pattern))
+
+
+def make_workload(num_cars, seed, pattern="random", mix="build", max_miles=1000):
+    """
+        makes the command lines of a workload: set_speed, then an add_car for every car with the other
+        commands of the mix mixed in, and a full show_train and a start at the end
+        the lines are the same as a train_run.py script, so a workload can also be run from a file
+        :param num_cars: how many cars to add
+        :param seed: the random seed so runs can be repeated
+        :param pattern: how the miles are drawn, one of MILE_PATTERNS
+        :param mix: which other commands come between the add_cars, one of MIXES
+        :param max_miles: the farthest distance
+        :return: the list of command lines
+    """
+    rng = random.Random(seed)
+    lines = ["set_speed 60\n"]
+    for car, miles in enumerate(car_miles(pattern, num_cars, max_miles, rng)):
+        lines.append("add_car car" + str(car) + " town" + str(rng.randrange(50)) + " " + str(miles) + "\n")
+        for action, chance in MIXES[mix].items():
+            if rng.random() >= chance:
+                continue
+            if action == "count_miles":
+                low = rng.randint(0, max_miles)
+                lines.append("count_miles " + str(low) + " " + str(rng.randint(low, max_miles)) + "\n")
+            elif action in ("cars_to", "detach"):
+                lines.append(action + " town" + str(rng.randrange(50)) + "\n")
+            elif action == "show_train":
+                lines.append("show_train " + str(rng.randrange(car + 1)) + " 100\n")
+            else:
+                lines.append(action + "\n")
+    lines.append("show_train\n")
+    lines.append("start\n")
+    lines.append("quit\n")
+    return lines
+
+
+def run_operation(parts, train, out):
+    """
+        runs one workload command by calling the command_list function straight away, without the
+        parsing and error handling of train_run.py
+        :param parts: the words of the command line
+        :param train: the linked list which represents the train
+        :param out: where show_train and start write, like os.devnull
+        :return: N/A
+    """
+    action, args = parts[0], parts[1:]
+    if action == "add_car":
+        add_car(args[0], args[1], args[2], train)
+    elif action == "set_speed":
+        set_speed(args[0], train)
+    elif action == "train_size":
+        train_size(train)
+    elif action == "count_miles":
+        count_miles(int(args[0]), int(args[1]), train)
+    elif action == "cars_to":
+        cars_to(args[0], train)
+    elif action == "detach":
+        detach(args[0], train)
+    elif action == "show_train":
+        if args:
+            write_train(train, out, int(args[0]), int(args[1]))
+        else:
+            write_train(train, out)
+    elif action == "start":
+        with contextlib.redirect_stdout(out):
+            start(train)
+
+
+def time_workload(lines):
+    """
+        runs a workload on a new train and times every command
+        :param lines: the command lines from make_workload
+        :return: a dict of each command name to (how many ran, total seconds)
+    """
+    commands = [line.split() for line in lines if line.split() and line.split()[0] != "quit"]
+    train = Entire_Train(None, 0, 0)
+    totals = {}
+    with open(os.devnull, "w") as out:
+        for parts in commands:
+            began = time.perf_counter_ns()
+            run_operation(parts, train, out)
+            took = time.perf_counter_ns() - began
+            count, nanoseconds = totals.get(parts[0], (0, 0))
+            totals[parts[0]] = (count + 1, nanoseconds + took)
+    return {action: (count, nanoseconds / 1e9) for action, (count, nanoseconds) in totals.items()}
+
+
+def peak_workload(lines):
+    """
+        runs a workload on a new train under tracemalloc, apart from the timed run so tracing does not slow it
+        :param lines: the command lines from make_workload
+        :return: the peak bytes the run allocated
+    """
+    commands = [line.split() for line in lines if line.split() and line.split()[0] != "quit"]
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    train = Entire_Train(None, 0, 0)
+    with open(os.devnull, "w") as out:
+        for parts in commands:
+            run_operation(parts, train, out)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak
+
+
+def bench_workloads(output, sizes, patterns=MILE_PATTERNS, mixes=tuple(MIXES), seed=0):
+    """
+        runs every generated workload and saves the time per command and peak memory as JSON, so
+        results from different versions of the train can be compared
+        :param output: the JSON file to write
+        :param sizes: the car counts to try
+        :param patterns: the mile patterns to try
+        :param mixes: the command mixes to try
+        :param seed: the random seed so runs can be repeated
+        :return: the list of result rows
+    """
+    rows = []
+    for size in sizes:
+        for pattern in patterns:
+            for mix in mixes:
+                lines = make_workload(size, seed, pattern, mix)
+                times = time_workload(lines)
+                peak = peak_workload(lines)
+                for action, (count, seconds) in sorted(times.items()):
+                    rows.append({"pattern": pattern, "mix": mix, "cars": size, "command": action,
+                                 "count": count, "seconds": seconds, "us_per_op": seconds / count * 1e6,
+                                 "peak_bytes": peak})
+                    print(pattern + " " + mix + " cars=" + str(size) + " " + action + " x" + str(count)
+                          + " " + format(seconds / count * 1e6, ".2f") + "us/op peak "
+                          + format(peak / 1e6, ".1f") + " MB")
+    with open(output, "w") as f:
+        json.dump({"python": platform.python_version(), "seed": seed, "results": rows}, f, indent=1)
+    return rows
+
+
+def main():
+    """
+        runs a benchmark from the command line
+        usage: benchmark_train.py add_car [size ...] | add_cars [size ...] | commands [num_lines]
+               | cold_start [num_cars] | memory [num_cars] | workloads <results.json> [size ...]
+               | generate <script file> <num_cars> [pattern] [mix] [seed]
+        :return: N/A
+    """
+    mode = sys.argv[1] if len(sys.argv) > 1 else "add_car"
+    if mode == "add_car":
+        sizes = [int(size) for size in sys.argv[2:]] or [1000, 5000, 20000]
+        bench_add_car(sizes)
+    elif mode == "add_cars":
+        sizes = [int(size) for size in sys.argv[2:]] or [10000, 100000]
+        bench_add_cars(sizes)
+    elif mode == "cold_start":
+        bench_cold_start(int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 6)
+    elif mode == "memory":
+        bench_memory(int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 6)
+    elif mode == "commands":
+        bench_commands(int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 6)
+    elif mode == "workloads":
+        sizes = [int(size) for size in sys.argv[3:]] or [10 ** 4, 10 ** 5]
+        bench_workloads(sys.argv[2], sizes)
+    elif mode == "generate":
+        pattern = sys.argv[4] if len(sys.argv) > 4 else "random"
+        mix = sys.argv[5] if len(sys.argv) > 5 else "mixed"
+        seed = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+        with open(sys.argv[2], "w") as f:
+            f.writelines(make_workload(int(sys.argv[3]), seed, pattern, mix))
+
+
+if __name__ == '__main__':
+    main()
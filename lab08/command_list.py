@@ -4,24 +4,52 @@ By: Isaac McKinney
 
 A series of commands used in a train yard simulation program
 """
+from bisect import bisect_left
+from itertools import count
 from typing import Union
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 """ 
     a dataclass for an individual train car
     contents: the item/s in the train cars
     destination: the location of drop off for the train car contents
-    miles: the distance to that destination
+    miles: the distance to that destination, parsed into an integer once when the car is made
     next: a node which points to the current train car and links it to the next train car. 
     represents the next train car that is attached to the train, if there is one
+    order: when the car was made, from NEXT_ORDER. cars with the same miles are newest first in the train,
+    so car_order gives every car its own place to bisect for
+    the car has slots instead of a __dict__, and its contents and destination come from SYMBOLS,
+    so a long train keeps one copy of each name. cars compare and hash by identity, so the index can key on them
 """
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True, eq=False)
 class Train_Car:
     contents: str
     destination: str
     miles: int
     next: Union["Train_Car", None] = None
+    order: int = 0
+
+
+""" 
+    a dataclass for a blocked sorted array of the train cars, kept in the same order as the linked list
+    blocks: lists of train cars, each one sorted by miles, and every car in a block comes before the next block
+    block_miles: the miles of each car in blocks, as integers
+    maxes: the largest miles in each block, so the right block is found with a bisect
+    by_destination: maps each destination to a dict with the cars going there as keys
+    counts: a Fenwick tree of the block sizes, so the cars before a block are counted in log time,
+    or None when blocks were split or removed and it has to be rebuilt before it is used again
+    bisect_steps: about how many steps add_car has taken bisecting for spots, for the stats command.
+    each add_car counts the bit lengths of the number of blocks and of the block it bisects
+"""
+@dataclass(frozen=False)
+class Car_Index:
+    blocks: list = field(default_factory=list)
+    block_miles: list = field(default_factory=list)
+    maxes: list = field(default_factory=list)
+    by_destination: dict = field(default_factory=dict)
+    counts: Union[list, None] = None
+    bisect_steps: int = 0
 
 
 """ 
@@ -29,12 +57,98 @@ class Train_Car:
     head: creates the initial linked list for the train cars to be added too and will represent the back train car
     speed: the mph for which the car travels
     num_cars: the number of cars in the train
+    index: the cars in a Car_Index, so add_car finds its place without walking the linked list
 """
 @dataclass(frozen=False)
 class Entire_Train:
     head: Union["Train_Car", None]
     speed: float
     num_cars: int
+    index: Car_Index = field(default_factory=Car_Index)
+
+
+""" 
+    a dataclass for one stop of a trip, made of the cars unloaded there
+    destination: where the train stopped, from the first car unloaded there
+    miles: the distance of the stop from the yard
+    num_cars: the number of cars unloaded at the stop
+    segment_time: the hours spent traveling to the stop
+    sep_time: the hours spent separating cars at the stop
+"""
+@dataclass(frozen=False)
+class Stop:
+    destination: str
+    miles: int
+    num_cars: int
+    segment_time: float
+    sep_time: float
+
+
+""" 
+    a dataclass for the result of running a train
+    stops: the list of Stops in the order they were made
+    total_time: the hours the whole trip took
+    total_distance: the miles traveled
+    num_cars: the number of cars unloaded
+"""
+@dataclass(frozen=False)
+class Trip_Report:
+    stops: list
+    total_time: float
+    total_distance: int
+    num_cars: int
+
+
+# the most cars a Car_Index block holds before it is split in half
+BLOCK_SIZE = 512
+
+# the symbol table of contents and destination names, so equal names share one string
+SYMBOLS = {}
+
+# how many train cars use each name in SYMBOLS. a name is dropped from both when its last car leaves
+SYMBOL_USES = {}
+
+# hands out the order of each new train car
+NEXT_ORDER = count(1)
+
+
+def symbol(name):
+    """
+        looks a name up in the symbol table for a new train car, adding it the first time it is seen
+        pre-condition: name is a string
+        post-condition: name is in SYMBOLS and counted once more in SYMBOL_USES
+        :param name: the contents or destination name
+        :return: the shared copy of name
+    """
+    shared = SYMBOLS.setdefault(name, name)
+    SYMBOL_USES[shared] = SYMBOL_USES.get(shared, 0) + 1
+    return shared
+
+
+def release(car):
+    """
+        helper function that gives back the names of a train car leaving the train
+        pre-condition: car is no longer in any train
+        post-condition: names no other car uses are out of SYMBOLS and SYMBOL_USES
+        :param car: the train car leaving
+        :return: N/A
+    """
+    for name in (car.contents, car.destination):
+        uses = SYMBOL_USES.get(name)
+        if uses == 1:
+            del SYMBOL_USES[name]
+            del SYMBOLS[name]
+        elif uses is not None:
+            SYMBOL_USES[name] = uses - 1
+
+
+def car_order(car):
+    """
+        helper function that gives where a car belongs in the train: by miles, newest first for equal miles
+        :param car: the train car
+        :return: a key that is different for every car and increases from the front of the train
+    """
+    return car.miles, -car.order
 
 
 def set_speed(speed, train):
@@ -58,37 +172,69 @@ def add_car(content, place, distance, train):
         adds a train car onto the train in the appropriate and optimal place
         pre-condition: command was called, contents, place, and distance have been inputted
         and train has been passed
-        post-condition: a new train car is made with the appropriate arguments and added to the right spot
+        post-condition: a new train car is made with the appropriate arguments and added to the right spot,
+        ahead of any cars with the same miles. the spot is found in train.index instead of walking the train
         :param content: train car contents
         :param place: the place for the contents to be delivered to
         :param distance: the total distance needed to travel to reach the place for drop-off
         :param train: the linked list being manipulated
         :return: the train with a new train car
     """
-    car = Train_Car(content, place, distance, None)
-    node = train.head
-    if node is None:
+    miles = int(distance)
+    car = Train_Car(symbol(content), symbol(place), miles, None, next(NEXT_ORDER))
+    previous = index_insert(train.index, car, miles)
+    if previous is None:
+        car.next = train.head
         train.head = car
     else:
-        successor = node
-        previous = None
-        while successor is not None:
-            if int(successor.miles) < int(car.miles):
-                previous = successor
-                successor = successor.next
-            else:
-                if previous is not None:
-                    previous.next = car
-                else:
-                    train.head = car
-                car.next = successor
-                break
-        if successor is None:
-            previous.next = car
+        car.next = previous.next
+        previous.next = car
     train.num_cars += 1
     return train
 
 
+def add_cars(cars, train):
+    """
+        adds a whole batch of train cars at once, in the same places add_car would put them one by one
+        the batch is sorted once and merged with the train in a single pass
+        pre-condition: cars is a list of (content, place, distance) and train has been passed
+        post-condition: every car is in the train, or none are if any distance is not a whole number
+        :param cars: the (content, place, distance) of each new car
+        :param train: the linked list being manipulated
+        :return: the train with the new train cars
+    """
+    # every distance is parsed before any name is counted in SYMBOL_USES, so a bad one leaves nothing behind
+    all_miles = [int(distance) for content, place, distance in cars]
+    # add_car puts a car ahead of the cars with the same miles, so later cars in the batch go first
+    batch = [Train_Car(symbol(content), symbol(place), miles, None, next(NEXT_ORDER))
+             for (content, place, distance), miles in zip(cars, all_miles)]
+    batch.sort(key=car_order)
+    merged_cars = []
+    merged_miles = []
+    index = train.index
+    old_cars = [car for block in index.blocks for car in block]
+    old_miles = [miles for block_miles in index.block_miles for miles in block_miles]
+    old_spot = 0
+    for car in batch:
+        miles = car.miles
+        while old_spot < len(old_miles) and old_miles[old_spot] < miles:
+            merged_cars.append(old_cars[old_spot])
+            merged_miles.append(old_miles[old_spot])
+            old_spot += 1
+        merged_cars.append(car)
+        merged_miles.append(miles)
+    merged_cars.extend(old_cars[old_spot:])
+    merged_miles.extend(old_miles[old_spot:])
+    for previous, car in zip(merged_cars, merged_cars[1:]):
+        previous.next = car
+    if merged_cars:
+        merged_cars[-1].next = None
+        train.head = merged_cars[0]
+    index_build(index, merged_cars, merged_miles)
+    train.num_cars += len(batch)
+    return train
+
+
 def train_size(train):
     """
         prints the number of train cars attached
@@ -109,53 +255,150 @@ def show_train(train):
         :return: engine speed as a float in mph and the string of train cars displayed in list format
     """
     print("engine (" + str(float(train.speed)) + ")")
-    if train.head is None:
-        result = []
-        return result
-    else:
-        result = "[ Train_Car"
-        node = train.head
-        while node is not None:
-            result += "(contents=" + str(node.contents) + " , "
-            result += "destination=" + str(node.destination) + " , "
-            result += "miles=" + str(node.miles) + ")"
-            if node.next is not None:
-                result += " , Train_Car"
-            node = node.next
-        result += " ]"
-        return result
+    return "".join(render_train(train))
+
+
+def write_train(train, out, offset=0, limit=None, compact=False):
+    """
+        writes the engine speed and the train cars to out a chunk at a time, so the whole train is never
+        held as one string
+        pre-condition: train is passed in, offset >= 0 and limit is None or >= 0
+        post-condition: the engine line and the chosen cars are written to out
+        :param train: the linked list being shown
+        :param out: the stream being written to, like sys.stdout
+        :param offset: how many cars from the front to skip
+        :param limit: the most cars to show, or None for all of them
+        :param compact: write one line per car instead of the list format
+        :return: N/A
+    """
+    out.write("engine (" + str(float(train.speed)) + ")\n")
+    for chunk in render_train(train, offset, limit, compact):
+        out.write(chunk)
+    if not compact:
+        out.write("\n")
 
 
-def start(train):
+def render_train(train, offset=0, limit=None, compact=False, chunk_size=256):
+    """
+        generator for the text of the train cars, in chunks of about chunk_size cars
+        the list format is the same as show_train, and the compact format is
+        "<position> <contents> <destination> <miles>" with one car per line
+        :param train: the linked list being shown
+        :param offset: how many cars from the front to skip
+        :param limit: the most cars to show, or None for all of them
+        :param compact: use the one line per car format
+        :param chunk_size: how many cars go in each chunk
+        :return: the chunks of text
+    """
+    pieces = []
+    shown = 0
+    for car in iter_cars(train, offset, limit):
+        if compact:
+            pieces.append(str(offset + shown + 1) + " " + str(car.contents) + " " + str(car.destination)
+                          + " " + str(car.miles) + "\n")
+        else:
+            pieces.append("[ Train_Car" if shown == 0 else " , Train_Car")
+            pieces.append("(contents=" + str(car.contents) + " , " + "destination=" + str(car.destination)
+                          + " , " + "miles=" + str(car.miles) + ")")
+        shown += 1
+        if shown % chunk_size == 0:
+            yield "".join(pieces)
+            pieces = []
+    if not compact:
+        pieces.append("[]" if shown == 0 else " ]")
+    if pieces:
+        yield "".join(pieces)
+
+
+def iter_cars(train, offset=0, limit=None):
+    """
+        generator for the train cars from the front, skipping whole index blocks to reach offset
+        :param train: the linked list being walked
+        :param offset: how many cars from the front to skip
+        :param limit: the most cars to give, or None for all of them
+        :return: the train cars in order
+    """
+    remaining = limit
+    for block in train.index.blocks:
+        if offset >= len(block):
+            offset -= len(block)
+            continue
+        for spot in range(offset, len(block)):
+            if remaining == 0:
+                return
+            yield block[spot]
+            if remaining is not None:
+                remaining -= 1
+        offset = 0
+
+
+def start(train, verbose=False):
     """
         starts and runs the simulation
         pre-condition: command is called, train is created to the users desire(it is filled) and passed in,
         train speed is > 0
-        post-condition: train is empty and appropriate output is printed
+        post-condition: train is empty and the trip is printed, stop by stop, or car by car if verbose
         :param train: the linked list being manipulated
-        :return: N/A
+        :param verbose: print every move, separation and unloading as it happens
+        :return: the Trip_Report, or None if the train was empty
+    """
+    if train.head is None:
+        print("Illegal Command Use")
+        return None
+    report = simulate(train, print if verbose else None)
+    if not verbose:
+        for stop in report.stops:
+            print("Stop at " + str(stop.destination) + " (" + str(stop.miles) + " miles): "
+                  + str(stop.num_cars) + " cars unloaded, " + str(round(stop.segment_time, 2))
+                  + " hours traveling, " + str(stop.sep_time) + " hours separating cars.")
+    print("total time for the trip was: " + str(round(report.total_time, 2)) + " hours")
+    print("total distance traveled is: " + str(report.total_distance) + " miles")
+    return report
+
+
+def simulate(train, log=None):
+    """
+        runs the whole train in one pass and groups the cars into stops, using the miles already parsed
+        into the index. a new stop starts whenever the train moves on and spends sep_time separating cars.
+        pre-condition: train is passed in and its speed is > 0
+        post-condition: train is empty
+        :param train: the linked list being manipulated
+        :param log: an optional function given each line of the event log as it happens, like print
+        :return: the Trip_Report with the per stop totals
     """
     travel_time = 0
     travel_dis = 0
     sep_time = 0.50
-    if train.head is None:
-        print("Illegal Command Use")
-    else:
-        while train.head is not None:
-            if float(travel_dis) != float(train.head.miles):
-                print("Moving on to " + str(train.head.destination) + ".")
-                print(str(sep_time) + " hours taken to separate cars.")
-                travel_time += sep_time
-            x = (float(train.head.miles) - travel_dis) / float(train.speed)
-            y = round(x, 2)
-            if y != 0:
-                print("this segment took " + str(y) + " to travel.")
-                travel_dis = int(train.head.miles)
-            travel_time += round(x, 2)
-            print("Unloading " + str(train.head.contents) + " in " + str(train.head.destination) + ".")
-            remove(train)
-        print("total time for the trip was: " + str(round(travel_time, 2)) + " hours")
-        print("total distance traveled is: " + str(travel_dis) + " miles")
+    speed = float(train.speed)
+    stops = []
+    stop = None
+    for block, block_miles in zip(train.index.blocks, train.index.block_miles):
+        for car, miles in zip(block, block_miles):
+            if travel_dis != miles or stop is None:
+                stop = Stop(car.destination, miles, 0, 0.0, 0.0)
+                stops.append(stop)
+                if travel_dis != miles:
+                    if log is not None:
+                        log("Moving on to " + str(car.destination) + ".")
+                        log(str(sep_time) + " hours taken to separate cars.")
+                    stop.sep_time += sep_time
+                    travel_time += sep_time
+            segment = round((miles - travel_dis) / speed, 2)
+            if segment != 0:
+                if log is not None:
+                    log("this segment took " + str(segment) + " to travel.")
+                travel_dis = miles
+            stop.segment_time += segment
+            travel_time += segment
+            stop.num_cars += 1
+            if log is not None:
+                log("Unloading " + str(car.contents) + " in " + str(car.destination) + ".")
+            release(car)
+    num_cars = train.num_cars
+    train.head = None
+    train.num_cars = 0
+    train.index = Car_Index()
+    return Trip_Report(stops, travel_time, travel_dis, num_cars)
 
 
 def remove(train):
@@ -170,10 +413,245 @@ def remove(train):
         temporary = train.head
         train.head = train.head.next
         temporary = None
+        index_pop_head(train.index)
         train.num_cars -= 1
     return train
 
 
+def index_insert(index, car, miles):
+    """
+        helper function that puts a car into the index ahead of any cars with the same miles
+        pre-condition: index holds the cars of the train in order
+        post-condition: car is in the index in the place add_car links it into the train
+        :param index: the Car_Index of the train
+        :param car: the new train car
+        :param miles: the car's miles as an integer
+        :return: the car that comes right before the new car, or None if it is the new head
+    """
+    index.by_destination.setdefault(car.destination, {})[car] = None
+    blocks = index.blocks
+    if not blocks:
+        blocks.append([car])
+        index.block_miles.append([miles])
+        index.maxes.append(miles)
+        index.counts = None
+        return None
+    spot = bisect_left(index.maxes, miles)
+    if spot == len(blocks):
+        spot -= 1
+    block = blocks[spot]
+    block_miles = index.block_miles[spot]
+    position = bisect_left(block_miles, miles)
+    index.bisect_steps += len(blocks).bit_length() + len(block_miles).bit_length()
+    if position > 0:
+        previous = block[position - 1]
+    elif spot > 0:
+        previous = blocks[spot - 1][-1]
+    else:
+        previous = None
+    block.insert(position, car)
+    block_miles.insert(position, miles)
+    if miles > index.maxes[spot]:
+        index.maxes[spot] = miles
+    if index.counts is not None:
+        index_count(index, spot, 1)
+    if len(block) > BLOCK_SIZE:
+        index.counts = None
+        half = len(block) // 2
+        blocks.insert(spot + 1, block[half:])
+        index.block_miles.insert(spot + 1, block_miles[half:])
+        index.maxes.insert(spot + 1, block_miles[-1])
+        del block[half:]
+        del block_miles[half:]
+        index.maxes[spot] = block_miles[-1]
+    return previous
+
+
+def index_build(index, cars, miles):
+    """
+        helper function that refills the index from a whole train at once
+        pre-condition: cars are in train order and miles holds their miles as integers
+        post-condition: the index holds the cars in half full blocks
+        :param index: the Car_Index of the train
+        :param cars: every car of the train, in order
+        :param miles: the miles of each car
+        :return: N/A
+    """
+    step = BLOCK_SIZE // 2
+    index.blocks = [cars[spot:spot + step] for spot in range(0, len(cars), step)]
+    index.block_miles = [miles[spot:spot + step] for spot in range(0, len(miles), step)]
+    index.maxes = [block_miles[-1] for block_miles in index.block_miles]
+    index.counts = None
+    index.by_destination = {}
+    for car in cars:
+        index.by_destination.setdefault(car.destination, {})[car] = None
+
+
+def index_pop_head(index):
+    """
+        helper function that takes the first car out of the index, used when the head is removed
+        pre-condition: index is not empty
+        post-condition: the first car is no longer in the index
+        :param index: the Car_Index of the train
+        :return: N/A
+    """
+    car = index.blocks[0][0]
+    forget_destination(index, car)
+    release(car)
+    del index.blocks[0][0]
+    del index.block_miles[0][0]
+    if not index.blocks[0]:
+        del index.blocks[0]
+        del index.block_miles[0]
+        del index.maxes[0]
+        index.counts = None
+    elif index.counts is not None:
+        index_count(index, 0, -1)
+
+
+def forget_destination(index, car):
+    """
+        helper function that takes a car out of the destination index
+        :param index: the Car_Index of the train
+        :param car: the train car leaving the train
+        :return: N/A
+    """
+    going = index.by_destination[car.destination]
+    del going[car]
+    if not going:
+        del index.by_destination[car.destination]
+
+
+def cars_to(place, train):
+    """
+        finds the cars going to one destination, using the destination index
+        pre-condition: train is passed in
+        post-condition: nothing is changed
+        :param place: the destination
+        :param train: the linked list being searched
+        :return: the list of train cars going to place
+    """
+    return list(train.index.by_destination.get(place, {}))
+
+
+def count_miles(low, high, train):
+    """
+        counts the cars whose miles are from low to high, both included, with two bisects of the index
+        and the block counts, so the time does not grow with the length of the train
+        pre-condition: train is passed in
+        post-condition: nothing is changed
+        :param low: the smallest miles to count
+        :param high: the largest miles to count
+        :param train: the linked list being searched
+        :return: the number of cars in the range
+    """
+    if high < low:
+        return 0
+    return index_rank(train.index, high + 1) - index_rank(train.index, low)
+
+
+def index_rank(index, miles):
+    """
+        helper function that counts the cars in the index with fewer miles than the given miles
+        :param index: the Car_Index of the train
+        :param miles: the miles to compare against
+        :return: the number of cars before miles
+    """
+    spot = bisect_left(index.maxes, miles)
+    before = index_before(index, spot)
+    if spot < len(index.blocks):
+        before += bisect_left(index.block_miles[spot], miles)
+    return before
+
+
+def index_before(index, spot):
+    """
+        helper function that counts the cars in the blocks before a block, rebuilding counts if it is stale
+        :param index: the Car_Index of the train
+        :param spot: the position of the block
+        :return: the number of cars in index.blocks[:spot]
+    """
+    counts = index.counts
+    if counts is None:
+        counts = index.counts = [0] + [len(block) for block in index.blocks]
+        for position in range(1, len(counts)):
+            parent = position + (position & -position)
+            if parent < len(counts):
+                counts[parent] += counts[position]
+    before = 0
+    while spot > 0:
+        before += counts[spot]
+        spot -= spot & -spot
+    return before
+
+
+def index_count(index, spot, change):
+    """
+        helper function that adds to the size of one block in counts
+        pre-condition: index.counts is not None
+        :param index: the Car_Index of the train
+        :param spot: the position of the block
+        :param change: how many cars the block gained, negative when it lost cars
+        :return: N/A
+    """
+    counts = index.counts
+    spot += 1
+    while spot < len(counts):
+        counts[spot] += change
+        spot += spot & -spot
+
+
+def index_find(index, car):
+    """
+        helper function that finds where a car is in the index with two bisects by car_order
+        pre-condition: car is in the index
+        :param index: the Car_Index of the train
+        :param car: the train car to find
+        :return: the position of its block and its position in that block
+    """
+    key = car_order(car)
+    spot = bisect_left(index.blocks, key, key=lambda block: car_order(block[-1]))
+    return spot, bisect_left(index.blocks[spot], key, key=car_order)
+
+
+def detach(place, train):
+    """
+        takes every car going to one destination off the train. each car is found through the
+        destination index and two bisects by car_order, so only the blocks holding those cars are touched
+        pre-condition: train is passed in
+        post-condition: no car in the train goes to place and num_cars is updated
+        :param place: the destination
+        :param train: the linked list being manipulated
+        :return: the number of cars taken off
+    """
+    index = train.index
+    going = index.by_destination.pop(place, {})
+    for car in going:
+        spot, position = index_find(index, car)
+        block = index.blocks[spot]
+        if position > 0:
+            block[position - 1].next = car.next
+        elif spot > 0:
+            index.blocks[spot - 1][-1].next = car.next
+        else:
+            train.head = car.next
+        car.next = None
+        release(car)
+        del block[position]
+        del index.block_miles[spot][position]
+        if not block:
+            del index.blocks[spot]
+            del index.block_miles[spot]
+            del index.maxes[spot]
+            index.counts = None
+        else:
+            index.maxes[spot] = index.block_miles[spot][-1]
+            if index.counts is not None:
+                index_count(index, spot, -1)
+    train.num_cars -= len(going)
+    return len(going)
+
+
 def help():
     """
         prints out possible command options
@@ -184,10 +662,15 @@ def help():
     print("List of Commands")
     print("=================")
     print("add_car < content > < station > < distance >")
+    print("add_cars < file of content station distance lines >")
     print("set_speed < speed >")
     print("train_size")
-    print("show_train")
-    print("start")
+    print("show_train [compact] [< offset > < limit >]")
+    print("start [verbose]")
+    print("cars_to < station >")
+    print("count_miles < low > < high >")
+    print("detach < station >")
+    print("stats")
     print("help")
     print("quit")
 
@@ -0,0 +1,157 @@
+"""
+file: instrument.py
+By: Isaac McKinney
+
+Counts what the train yard command loop spends its time on: how often each command runs, how long it
+takes as a histogram, how long the train is and about how many bisect steps add_car takes to find its spot.
+Recording a command is two clock reads and one dict lookup, so it is always on
+"""
+import json
+import time
+from dataclasses import dataclass, field
+
+
+# the latency histograms have one bucket per power of two: bucket b counts the calls that took less
+# than 2 ** b microseconds, and the last bucket counts everything slower
+BUCKETS = 32
+
+
+"""
+    a dataclass for the numbers kept about one command
+    calls: how many times it ran, including the times it was used wrongly
+    errors: how many times it was used wrongly
+    nanoseconds: the total time its calls took
+    slowest: its slowest call in nanoseconds
+    histogram: its list of BUCKETS latency counts
+"""
+@dataclass(frozen=False, slots=True)
+class Command_Stats:
+    calls: int = 0
+    errors: int = 0
+    nanoseconds: int = 0
+    slowest: int = 0
+    histogram: list = field(default_factory=lambda: [0] * BUCKETS)
+
+
+"""
+    a dataclass for the numbers kept about the commands that were run
+    began: the time counting started, from time.perf_counter_ns
+    commands: maps each command name to its Command_Stats
+    bisect_steps: about how many bisect steps add_car took in the index while finding spots
+"""
+@dataclass(frozen=False)
+class Stats:
+    began: int = field(default_factory=time.perf_counter_ns)
+    commands: dict = field(default_factory=dict)
+    bisect_steps: int = 0
+
+
+def measure(stats, action, nanoseconds, failed=False):
+    """
+        records one call of a command
+        pre-condition: stats is passed in and nanoseconds >= 0
+        post-condition: the call is counted in the command's totals and histogram
+        :param stats: the Stats being kept
+        :param action: the command name
+        :param nanoseconds: how long the call took
+        :param failed: True if the command was used wrongly
+        :return: N/A
+    """
+    command = stats.commands.get(action)
+    if command is None:
+        command = stats.commands[action] = Command_Stats()
+    command.calls += 1
+    command.nanoseconds += nanoseconds
+    if nanoseconds > command.slowest:
+        command.slowest = nanoseconds
+    if failed:
+        command.errors += 1
+    bucket = (nanoseconds // 1000).bit_length()
+    command.histogram[bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+
+
+def percentile(histogram, fraction):
+    """
+        helper function that reads a percentile off a latency histogram
+        :param histogram: the BUCKETS counts of one command
+        :param fraction: which percentile, like 0.99
+        :return: the bucket limit in microseconds that fraction of the calls were faster than
+    """
+    needed = fraction * sum(histogram)
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        seen += count
+        if seen >= needed and count:
+            return 2 ** bucket
+    return 2 ** (BUCKETS - 1)
+
+
+def stats_summary(stats, train):
+    """
+        puts the numbers together, both for the stats command and for the JSON dump
+        pre-condition: stats and train are passed in
+        post-condition: nothing is changed
+        :param stats: the Stats being kept
+        :param train: the linked list which represents the train
+        :return: a dict of the totals, with one dict per command under "commands"
+    """
+    seconds = (time.perf_counter_ns() - stats.began) / 1e9
+    commands = {}
+    for action in sorted(stats.commands):
+        command = stats.commands[action]
+        commands[action] = {
+            "calls": command.calls,
+            "errors": command.errors,
+            "total_seconds": command.nanoseconds / 1e9,
+            "mean_us": command.nanoseconds / command.calls / 1000,
+            "p50_us": percentile(command.histogram, 0.5),
+            "p99_us": percentile(command.histogram, 0.99),
+            "max_us": command.slowest / 1000,
+            "histogram_us": {str(2 ** bucket): count
+                             for bucket, count in enumerate(command.histogram) if count},
+        }
+    total_calls = sum(command.calls for command in stats.commands.values())
+    add_car = stats.commands.get("add_car")
+    add_car_calls = add_car.calls if add_car is not None else 0
+    return {
+        "uptime_seconds": seconds,
+        "commands_run": total_calls,
+        "commands_per_second": total_calls / seconds if seconds > 0 else 0.0,
+        "train_length": train.num_cars,
+        "bisect_steps_per_add_car": stats.bisect_steps / add_car_calls if add_car_calls else 0.0,
+        "commands": commands,
+    }
+
+
+def print_stats(stats, train):
+    """
+        prints a table of the numbers kept for each command, then the totals
+        :param stats: the Stats being kept
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    summary = stats_summary(stats, train)
+    print("{:<12} {:>9} {:>7} {:>10} {:>10} {:>8} {:>8} {:>10}".format(
+        "command", "calls", "errors", "total_s", "mean_us", "p50_us", "p99_us", "max_us"))
+    for action, row in summary["commands"].items():
+        print("{:<12} {:>9} {:>7} {:>10.4f} {:>10.1f} {:>8} {:>8} {:>10.1f}".format(
+            action, row["calls"], row["errors"], row["total_seconds"], row["mean_us"], row["p50_us"],
+            row["p99_us"], row["max_us"]))
+    print("train length: " + str(summary["train_length"]) + " cars")
+    print("bisect steps per add_car: " + format(summary["bisect_steps_per_add_car"], ".1f"))
+    print("throughput: " + str(summary["commands_run"]) + " commands in "
+          + format(summary["uptime_seconds"], ".2f") + "s, "
+          + format(summary["commands_per_second"], ".0f") + " commands/s")
+
+
+def dump_stats(stats, train, path):
+    """
+        writes the numbers kept to a JSON file
+        :param stats: the Stats being kept
+        :param train: the linked list which represents the train
+        :param path: the file to write
+        :return: N/A
+    """
+    with open(path, "w") as f:
+        json.dump(stats_summary(stats, train), f, indent=2)
+        f.write("\n")
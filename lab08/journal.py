@@ -0,0 +1,288 @@
+"""
+file: journal.py
+By: Isaac McKinney
+
+Keeps the train yard on disk. Every command that changes the train is appended to a binary journal,
+and every so often the whole car list is written to a compact snapshot and the journal starts over
+empty. A restart loads the snapshot with mmap and only replays the journal written after it
+"""
+import gc
+import mmap
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+
+from command_list import *
+
+
+# journal record types
+OP_ADD_CAR = 1
+OP_ADD_CARS = 2
+OP_SET_SPEED = 3
+OP_START = 4
+OP_DETACH = 5
+
+# a journal record is its type and payload length, then the payload: its text fields joined by "\0"
+RECORD = struct.Struct("<BI")
+
+# snapshot header: magic, the generation of the journal that goes on from it, speed, number of cars,
+# then the byte lengths of the contents and destination text blobs. the integer miles array follows the blobs
+SNAPSHOT = struct.Struct("<4sQdQQQ")
+MAGIC = b"TRN3"
+
+# journal header: magic and generation. each snapshot starts a new journal one generation on, so a journal
+# left behind by a crash while the two were being swapped is known to be older than the snapshot
+JOURNAL_HEADER = struct.Struct("<4sQ")
+JOURNAL_MAGIC = b"TRJ1"
+
+
+"""
+    a dataclass for an open journal
+    folder: the folder holding journal.bin and snapshot.bin
+    file: journal.bin, opened for appending
+    records: how many records were written since the last snapshot
+    snapshot_every: how many records to write before taking another snapshot
+    generation: the generation written in journal.bin's header, the same as in the latest snapshot
+"""
+@dataclass(frozen=False)
+class Journal:
+    folder: str
+    file: object
+    records: int
+    snapshot_every: int
+    generation: int = 0
+
+
+def open_journal(folder, train, snapshot_every=100000):
+    """
+        restores the train from the folder, then opens the journal to keep recording
+        pre-condition: train is a new, empty Entire_Train
+        post-condition: train is back in the state it was in when the journal was last written
+        :param folder: the folder holding the state, made if it does not exist
+        :param train: the train to restore into
+        :param snapshot_every: how many records to write before taking another snapshot
+        :return: the open Journal
+    """
+    os.makedirs(folder, exist_ok=True)
+    generation, end = restore(folder, train)
+    path = os.path.join(folder, "journal.bin")
+    if end is None:
+        # there is no journal of the snapshot's generation yet, so everything is in the snapshot
+        start_journal(folder, generation)
+        os.replace(path + ".tmp", path)
+        sync_folder(folder)
+        end = JOURNAL_HEADER.size
+    file = open(path, "ab")
+    # drop a record that was only half written when the program stopped
+    file.truncate(end)
+    file.seek(end)
+    return Journal(folder, file, 0, snapshot_every, generation)
+
+
+def close_journal(journal, train):
+    """
+        takes a final snapshot, so the next start has nothing to replay, and closes the journal
+        :param journal: the open Journal
+        :param train: the train being recorded
+        :return: N/A
+    """
+    write_snapshot(journal, train)
+    journal.file.close()
+
+
+def record(journal, action, args, result, train):
+    """
+        appends a command that changed the train to the journal, and takes a snapshot when it is due
+        pre-condition: the command ran without an error
+        post-condition: the command is handed to the operating system, and synced to disk at the next snapshot
+        :param journal: the open Journal
+        :param action: the command name
+        :param args: the words after the command name
+        :param result: what the command's handler returned, the list of cars for add_cars
+        :param train: the train being recorded
+        :return: N/A
+    """
+    if action == "add_car":
+        op, fields = OP_ADD_CAR, args
+    elif action == "add_cars":
+        op, fields = OP_ADD_CARS, [word for car in result for word in car]
+    elif action == "set_speed":
+        op, fields = OP_SET_SPEED, args
+    elif action == "start":
+        op, fields = OP_START, []
+    elif action == "detach":
+        op, fields = OP_DETACH, args
+    else:
+        return
+    payload = "\0".join(fields).encode()
+    journal.file.write(RECORD.pack(op, len(payload)) + payload)
+    journal.file.flush()
+    journal.records += 1
+    if journal.records >= journal.snapshot_every:
+        write_snapshot(journal, train)
+
+
+def write_snapshot(journal, train):
+    """
+        writes the whole train to snapshot.bin and starts an empty journal.bin of the next generation.
+        the journal is synced first, and both new files are written and synced next to the old ones and then
+        swapped in, snapshot first, so a crash never leaves half a file. a crash between the two swaps
+        leaves the old journal behind, which restore skips because its generation is older
+        :param journal: the open Journal
+        :param train: the train being recorded
+        :return: N/A
+    """
+    journal.file.flush()
+    os.fsync(journal.file.fileno())
+    generation = journal.generation + 1
+    start_journal(journal.folder, generation)
+    cars = [car for block in train.index.blocks for car in block]
+    contents = "\n".join(str(car.contents) for car in cars).encode()
+    destinations = "\n".join(str(car.destination) for car in cars).encode()
+    miles = array('q', [value for block_miles in train.index.block_miles for value in block_miles])
+    path = os.path.join(journal.folder, "snapshot.bin")
+    with open(path + ".tmp", "wb") as f:
+        f.write(SNAPSHOT.pack(MAGIC, generation, float(train.speed), len(cars),
+                              len(contents), len(destinations)))
+        f.write(contents)
+        f.write(destinations)
+        f.write(miles.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+    # the new snapshot has to be in place before the new journal, or the old journal would be skipped
+    sync_folder(journal.folder)
+    # a file that is still open cannot be replaced on windows
+    journal.file.close()
+    journal_path = os.path.join(journal.folder, "journal.bin")
+    os.replace(journal_path + ".tmp", journal_path)
+    sync_folder(journal.folder)
+    journal.file = open(journal_path, "ab")
+    journal.generation = generation
+    journal.records = 0
+
+
+def start_journal(folder, generation):
+    """
+        helper function that writes an empty journal to journal.bin.tmp and syncs it, ready to be swapped in
+        :param folder: the folder holding the state
+        :param generation: the generation to write in its header
+        :return: N/A
+    """
+    with open(os.path.join(folder, "journal.bin.tmp"), "wb") as f:
+        f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, generation))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def sync_folder(folder):
+    """
+        helper function that syncs a folder, so the files swapped into it stay swapped after a crash
+        windows cannot open a folder to sync it, and keeps renames on its own
+        :param folder: the folder holding the state
+        :return: N/A
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    descriptor = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def restore(folder, train):
+    """
+        loads the latest snapshot, if there is one, and replays the journal written after it
+        :param folder: the folder holding the state
+        :param train: the empty train to restore into
+        :return: tuple of the snapshot's generation and the journal offset just past the last whole record,
+        which is None when there is no journal of that generation
+    """
+    generation = load_snapshot(os.path.join(folder, "snapshot.bin"), train)
+    return generation, replay(os.path.join(folder, "journal.bin"), generation, train)
+
+
+def load_snapshot(path, train):
+    """
+        fills the train from a snapshot file read through mmap
+        :param path: the snapshot file
+        :param train: the empty train to fill
+        :return: the generation of the journal that goes on from the snapshot, 0 if there is no snapshot
+    """
+    if not os.path.exists(path) or os.path.getsize(path) < SNAPSHOT.size:
+        return 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, generation, speed, count, contents_size, destinations_size = \
+            SNAPSHOT.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a train snapshot: " + path)
+        spot = SNAPSHOT.size
+        contents = data[spot:spot + contents_size].decode().split("\n")
+        spot += contents_size
+        destinations = data[spot:spot + destinations_size].decode().split("\n")
+        spot += destinations_size
+        miles = array('q')
+        miles.frombytes(data[spot:spot + 8 * count])
+        miles = miles.tolist()
+    train.speed = speed
+    if count == 0:
+        return generation
+    # the cars hold no cycles, so the collector only slows down making a million of them at once
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        # the cars are made from the back, so the older of two cars with the same miles comes later
+        cars = [Train_Car(symbol(content), symbol(place), distance, None, next(NEXT_ORDER))
+                for content, place, distance in zip(reversed(contents), reversed(destinations),
+                                                    reversed(miles))]
+        cars.reverse()
+    finally:
+        if collecting:
+            gc.enable()
+    for previous, car in zip(cars, cars[1:]):
+        previous.next = car
+    train.head = cars[0]
+    train.num_cars = count
+    index_build(train.index, cars, miles)
+    return generation
+
+
+def replay(path, generation, train):
+    """
+        runs the journal's records against the train, if the journal is of the given generation
+        a record cut off at the end of the file is ignored
+        :param path: the journal file
+        :param generation: the generation of the snapshot the train was loaded from
+        :param train: the train to run the records on
+        :return: the offset just past the last whole record, or None if there is no journal of that generation
+    """
+    if not os.path.exists(path) or os.path.getsize(path) < JOURNAL_HEADER.size:
+        return None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if JOURNAL_HEADER.unpack_from(data, 0) != (JOURNAL_MAGIC, generation):
+            return None
+        offset = JOURNAL_HEADER.size
+        size = len(data)
+        while offset + RECORD.size <= size:
+            op, length = RECORD.unpack_from(data, offset)
+            start_of_payload = offset + RECORD.size
+            if start_of_payload + length > size:
+                break
+            payload = data[start_of_payload:start_of_payload + length].decode()
+            fields = payload.split("\0") if payload else []
+            if op == OP_ADD_CAR:
+                add_car(fields[0], fields[1], fields[2], train)
+            elif op == OP_ADD_CARS:
+                add_cars(list(zip(fields[0::3], fields[1::3], fields[2::3])), train)
+            elif op == OP_SET_SPEED:
+                set_speed(fields[0], train)
+            elif op == OP_START:
+                # journals written before bad starts were rejected can hold starts that never ran
+                if train.num_cars > 0 and float(train.speed) > 0:
+                    simulate(train)
+            elif op == OP_DETACH:
+                detach(fields[0], train)
+            offset = start_of_payload + length
+    return offset
@@ -0,0 +1,287 @@
+"""
+file: optimizer.py
+By: Isaac McKinney
+
+Splits the cars of several trains across their engines so the trips take as little time as possible.
+A trip's time only depends on the distances the train stops at, so the search moves whole stops from
+one engine to another. Local searches from different starting plans run at once in worker processes,
+and the best plan any of them finds within the time budget is kept
+"""
+import os
+import random
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from command_list import *
+
+
+# the hours spent separating cars at each stop, the same as simulate
+SEP_TIME = 0.50
+
+# what a plan can be scored by: the sum of the trip times, or the longest trip
+OBJECTIVES = ("total", "max")
+
+
+"""
+    a dataclass for one way of splitting the stops across the engines
+    assignment: maps each distance to the position of the engine that stops there
+    times: the trip time of each engine in hours, the same as simulate would report
+    total_time: the sum of the trip times
+    max_time: the longest trip time, which is when the last train is done
+"""
+@dataclass(frozen=False)
+class Plan:
+    assignment: dict
+    times: list
+    total_time: float
+    max_time: float
+
+
+def trip_time(stops, speed, counts):
+    """
+        works out how long simulate takes to run a train that stops at the given distances, following
+        its rounding: a segment that rounds to 0.00 hours does not move the train on, so every car at
+        that stop is separated on its own and the next segment is measured from the stop before
+        pre-condition: stops is sorted with no repeats and speed > 0
+        post-condition: nothing is changed
+        :param stops: the distances the train stops at
+        :param speed: the train speed in mph
+        :param counts: maps each distance to the number of cars going there
+        :return: the total trip time in hours, added up in the same order as simulate
+    """
+    travel_dis = 0
+    hours = 0
+    for miles in stops:
+        if miles == travel_dis:
+            continue
+        segment = round((miles - travel_dis) / speed, 2)
+        if segment != 0:
+            hours += SEP_TIME
+            hours += segment
+            travel_dis = miles
+        else:
+            for car in range(counts[miles]):
+                hours += SEP_TIME
+    return hours
+
+
+def insert_time(route, miles, speed, counts):
+    """
+        helper function that works out how many hours stopping at one more distance adds to a trip
+        the miles are whole numbers, so when even one mile takes 0.01 hours or more no segment rounds
+        to 0.00 and only the stops on either side of the new one change. otherwise the whole route is timed
+        pre-condition: route is sorted with no repeats and does not hold miles
+        :param route: the distances the train already stops at
+        :param miles: the new distance
+        :param speed: the train speed in mph
+        :param counts: maps each distance to the number of cars going there
+        :return: the hours added, the same as the change in trip_time
+    """
+    spot = bisect_left(route, miles)
+    if round(1 / speed, 2) == 0:
+        return trip_time(route[:spot] + [miles] + route[spot:], speed, counts) \
+            - trip_time(route, speed, counts)
+    before = route[spot - 1] if spot > 0 else 0
+    hours = 0 if miles == before else SEP_TIME + round((miles - before) / speed, 2)
+    if spot < len(route):
+        after = route[spot]
+        if after != before:
+            hours -= SEP_TIME + round((after - before) / speed, 2)
+        hours += SEP_TIME + round((after - miles) / speed, 2)
+    return hours
+
+
+def score(times, objective):
+    """
+        helper function that ranks a plan, with the other objective breaking ties
+        :param times: the trip time of each engine
+        :param objective: "total" or "max"
+        :return: a tuple where smaller is better
+    """
+    if objective == "max":
+        return max(times), sum(times)
+    return sum(times), max(times)
+
+
+def greedy(stops, speeds, objective, counts):
+    """
+        makes a starting plan by giving each stop, farthest first, to the engine where it scores best
+        :param stops: the sorted distances to stop at
+        :param speeds: the speed of each engine
+        :param objective: "total" or "max"
+        :param counts: maps each distance to the number of cars going there
+        :return: the engine position of each stop
+    """
+    routes = [[] for speed in speeds]
+    times = [0.0 for speed in speeds]
+    owner = [0 for miles in stops]
+    for spot in range(len(stops) - 1, -1, -1):
+        miles = stops[spot]
+        best = None
+        for engine, speed in enumerate(speeds):
+            added = insert_time(routes[engine], miles, speed, counts)
+            times[engine] += added
+            rank = score(times, objective)
+            times[engine] -= added
+            if best is None or rank < best[0]:
+                best = (rank, engine, added)
+        rank, engine, added = best
+        routes[engine].insert(0, miles)
+        times[engine] += added
+        owner[spot] = engine
+    return owner
+
+
+def search_plan(stops, speeds, objective, seconds, seed, counts):
+    """
+        one local search, which is the unit of work handed to each worker process by plan_trains
+        it starts from the greedy plan when seed is 0 and a random plan otherwise, then keeps moving a
+        random stop to another engine whenever that is no worse. when it stops finding better plans it
+        starts over, from a shake up of the best plan or from a new random plan, until the time runs out
+        pre-condition: stops is sorted with no repeats and every speed is > 0
+        post-condition: nothing is printed
+        :param stops: the distances to stop at
+        :param speeds: the speed of each engine
+        :param objective: "total" or "max"
+        :param seconds: how long to search for
+        :param seed: the random seed, so each worker searches differently
+        :param counts: maps each distance to the number of cars going there
+        :return: the engine position of each stop in the best plan found
+    """
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + seconds
+    if seed == 0:
+        owner = greedy(stops, speeds, objective, counts)
+    else:
+        owner = [rng.randrange(len(speeds)) for miles in stops]
+    if len(speeds) < 2 or not stops:
+        return owner
+    best_owner = list(owner)
+    best_rank = None
+    moves = 0
+    restarts = 0
+    since_better = 0
+    while True:
+        routes = [[] for speed in speeds]
+        for miles, engine in zip(stops, owner):
+            routes[engine].append(miles)
+        times = [trip_time(route, speed, counts) for route, speed in zip(routes, speeds)]
+        rank = score(times, objective)
+        if best_rank is None or rank < best_rank:
+            best_rank, best_owner = rank, list(owner)
+        while since_better < 20 * len(stops):
+            moves += 1
+            if moves % 256 == 0 and time.perf_counter() > deadline:
+                return best_owner
+            spot = rng.randrange(len(stops))
+            miles = stops[spot]
+            old = owner[spot]
+            new = rng.randrange(len(speeds) - 1)
+            if new >= old:
+                new += 1
+            route = routes[old]
+            del route[bisect_left(route, miles)]
+            removed = insert_time(route, miles, speeds[old], counts)
+            added = insert_time(routes[new], miles, speeds[new], counts)
+            times[old] -= removed
+            times[new] += added
+            new_rank = score(times, objective)
+            if new_rank <= rank:
+                insort(routes[new], miles)
+                owner[spot] = new
+                rank = new_rank
+                if rank < best_rank:
+                    best_rank, best_owner = rank, list(owner)
+                    since_better = 0
+                    continue
+            else:
+                insort(route, miles)
+                times[old] += removed
+                times[new] -= added
+            since_better += 1
+        if time.perf_counter() > deadline:
+            return best_owner
+        restarts += 1
+        if restarts % 2 == 0:
+            owner = [rng.randrange(len(speeds)) for miles in stops]
+        else:
+            owner = list(best_owner)
+            for spot in rng.sample(range(len(stops)), rng.randint(1, len(stops) // 4 + 1)):
+                owner[spot] = rng.randrange(len(speeds))
+        since_better = 0
+
+
+def make_plan(stops, speeds, owner, counts):
+    """
+        helper function that turns the engine position of each stop into a Plan with exact trip times
+        :param stops: the sorted distances to stop at
+        :param speeds: the speed of each engine
+        :param owner: the engine position of each stop
+        :param counts: maps each distance to the number of cars going there
+        :return: the Plan
+    """
+    routes = [[] for speed in speeds]
+    for miles, engine in zip(stops, owner):
+        routes[engine].append(miles)
+    times = [trip_time(route, speed, counts) for route, speed in zip(routes, speeds)]
+    return Plan(dict(zip(stops, owner)), times, sum(times), max(times))
+
+
+def plan_trains(miles, speeds, objective="max", seconds=1.0, workers=None):
+    """
+        finds a good way to split cars across engines, scored with the same time model as start
+        pre-condition: there is at least one engine, every speed is > 0 and objective is in OBJECTIVES
+        post-condition: nothing is changed or printed
+        :param miles: the miles of every car to deliver, repeats allowed
+        :param speeds: the speed of each engine
+        :param objective: "total" to make the trips add up to the least time, or "max" for the last train
+        to finish as early as possible
+        :param seconds: the time budget of each search
+        :param workers: the number of searches, each in its own process, the default is one per cpu
+        :return: the best Plan found
+    """
+    if not speeds or min(speeds) <= 0 or objective not in OBJECTIVES or seconds < 0:
+        raise ValueError
+    counts = Counter(miles)
+    stops = sorted(counts)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        owners = [search_plan(stops, speeds, objective, seconds, 0, counts)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(search_plan, stops, speeds, objective, seconds, seed, counts)
+                       for seed in range(workers)]
+            owners = [future.result() for future in futures]
+    plans = [make_plan(stops, speeds, owner, counts) for owner in owners]
+    return min(plans, key=lambda plan: score(plan.times, objective))
+
+
+def regroup(trains, objective="max", seconds=1.0, workers=None):
+    """
+        takes the cars off every given train and loads them back following the best plan found
+        pre-condition: no train is running and every speed is > 0
+        post-condition: every car is on the engine the plan gives its miles to
+        :param trains: the Entire_Trains to split the cars across
+        :param objective: "total" or "max"
+        :param seconds: the time budget of each search
+        :param workers: the number of worker processes, the default is one per cpu
+        :return: the Plan that was loaded
+    """
+    cars = [car for train in trains for block in train.index.blocks for car in block]
+    plan = plan_trains([car.miles for car in cars], [float(train.speed) for train in trains],
+                       objective, seconds, workers)
+    loads = [[] for train in trains]
+    # add_cars puts the later cars of a batch first among equal miles, so loading back to front keeps the order
+    for car in reversed(cars):
+        loads[plan.assignment[car.miles]].append((car.contents, car.destination, car.miles))
+    for train, load in zip(trains, loads):
+        train.head = None
+        train.num_cars = 0
+        train.index = Car_Index()
+        add_cars(load, train)
+    for car in cars:
+        release(car)
+    return plan
@@ -4,62 +4,279 @@ by: Isaac McKinney
 
 runs a simulated train yard based off a serious of user inputted commands
 """
+import sys
+import time
+
 from command_list import *
+from instrument import Stats, measure, print_stats, dump_stats
+from journal import open_journal, close_journal, record as journal_record
 
 
-def process_commands(command, train):
+def do_set_speed(args, train):
     """
-        process the inputted command
-        pre-condition: command has been passed in as an input and a train has been created
-        post-condition: command has been read and processed, train is adjusted accordingly
-        :param command: the action the user wishes to have processed
+        runs the set_speed command
+        :param args: the words after the command name
         :param train: the linked list which represents the train
         :return: N/A
     """
-    action = command.split()[0]
-    if action == "set_speed":
-        try:
-            speed = command.split()[1]
-            set_speed(speed, train)
-        except ValueError:
-            print("Illegal Command Use or Form")
-    elif action == "help":
-        help()
-    elif action == "add_car":
-        try:
-            content, place, distance = command.split()[1:]
-            add_car(content, place, distance, train)
-        except ValueError:
-            print("Illegal Command Use or Form")
-    elif action == "quit":
-        return quit()
-    elif action == "train_size":
-        print("Number of cars attached to the train is " + str(train_size(train)))
-    elif action == "show_train":
-        print(show_train(train))
-    elif action == "start":
-        if train.speed <= 0:
-            print("Illegal Command Use or Form")
-        else:
-            start(train)
+    if len(args) != 1:
+        raise ValueError
+    set_speed(args[0], train)
+
+
+def do_help(args, train):
+    """
+        runs the help command
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    help()
+
+
+def do_add_car(args, train):
+    """
+        runs the add_car command
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    content, place, distance = args
+    add_car(content, place, distance, train)
+
+
+def do_add_cars(args, train):
+    """
+        runs the add_cars command, which loads a file with one "content station distance" car per line
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: the list of cars that were added
+    """
+    if len(args) != 1:
+        raise ValueError
+    try:
+        with open(args[0]) as f:
+            cars = [tuple(line.split()) for line in f if line.strip()]
+    except OSError:
+        raise ValueError
+    for car in cars:
+        if len(car) != 3:
+            raise ValueError
+    add_cars(cars, train)
+    return cars
+
+
+def do_train_size(args, train):
+    """
+        runs the train_size command
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    print("Number of cars attached to the train is " + str(train_size(train)))
+
+
+def do_show_train(args, train):
+    """
+        runs the show_train command, which can be given "compact" and an offset and limit for one page of cars
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    compact = args[:1] == ["compact"]
+    if compact:
+        args = args[1:]
+    if len(args) == 0:
+        offset, limit = 0, None
+    elif len(args) == 2:
+        offset, limit = int(args[0]), int(args[1])
+        if offset < 0 or limit < 0:
+            raise ValueError
     else:
+        raise ValueError
+    write_train(train, sys.stdout, offset, limit, compact)
+
+
+def do_start(args, train):
+    """
+        runs the start command, which prints the event log of every car when given "verbose"
+        a start that is not allowed raises ValueError, so it is reported and never journaled
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    if train.speed <= 0 or args not in ([], ["verbose"]):
+        raise ValueError
+    start(train, args == ["verbose"])
+
+
+def do_cars_to(args, train):
+    """
+        runs the cars_to command, which lists the cars going to one station
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    if len(args) != 1:
+        raise ValueError
+    cars = cars_to(args[0], train)
+    for car in cars:
+        print("Train_Car(contents=" + str(car.contents) + " , destination=" + str(car.destination)
+              + " , miles=" + str(car.miles) + ")")
+    print("Number of cars going to " + args[0] + " is " + str(len(cars)))
+
+
+def do_count_miles(args, train):
+    """
+        runs the count_miles command
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    low, high = args
+    print("Number of cars from " + low + " to " + high + " miles is "
+          + str(count_miles(int(low), int(high), train)))
+
+
+def do_detach(args, train):
+    """
+        runs the detach command, which takes every car going to one station off the train
+        :param args: the words after the command name
+        :param train: the linked list which represents the train
+        :return: N/A
+    """
+    if len(args) != 1:
+        raise ValueError
+    print("Detached " + str(detach(args[0], train)) + " cars going to " + args[0])
+
+
+# maps each command name to the function that runs it. quit is handled by process_command
+COMMANDS = {
+    "set_speed": do_set_speed,
+    "help": do_help,
+    "add_car": do_add_car,
+    "add_cars": do_add_cars,
+    "train_size": do_train_size,
+    "show_train": do_show_train,
+    "start": do_start,
+    "cars_to": do_cars_to,
+    "count_miles": do_count_miles,
+    "detach": do_detach,
+}
+
+
+def process_command(command, train, journal=None, stats=None):
+    """
+        process one command
+        pre-condition: command is a line of input and a train has been created
+        post-condition: command has been read and processed, train is adjusted accordingly
+        :param command: the action the user wishes to have processed
+        :param train: the linked list which represents the train
+        :param journal: an open journal.Journal that records the commands that change the train, or None
+        :param stats: an instrument.Stats that times every command and answers the stats command, or None
+        :return: False if the command was quit, otherwise True
+    """
+    parts = command.split()
+    if not parts:
+        return True
+    action = parts[0]
+    if action == "quit":
+        quit()
+        return False
+    if action == "stats" and stats is not None:
+        print_stats(stats, train)
+        return True
+    handler = COMMANDS.get(action)
+    if handler is None:
         print("Illegal Command Name: Command doesn't exist in database")
-    command = str(input("Enter a command: "))
-    process_commands(command, train)
+        return True
+    if stats is not None:
+        bisect_steps = train.index.bisect_steps
+        began = time.perf_counter_ns()
+    try:
+        result = handler(parts[1:], train)
+    except ValueError:
+        print("Illegal Command Use or Form")
+        if stats is not None:
+            measure(stats, action, time.perf_counter_ns() - began, True)
+        return True
+    if stats is not None:
+        measure(stats, action, time.perf_counter_ns() - began)
+        if action == "add_car":
+            stats.bisect_steps += train.index.bisect_steps - bisect_steps
+    if journal is not None:
+        journal_record(journal, action, parts[1:], result, train)
+    return True
+
+
+def process_commands(command, train, journal=None, stats=None):
+    """
+        process the inputted command, then keep prompting for commands until quit
+        pre-condition: command has been passed in as an input and a train has been created
+        post-condition: commands have been read and processed until quit, train is adjusted accordingly
+        :param command: the action the user wishes to have processed
+        :param train: the linked list which represents the train
+        :param journal: an open journal.Journal, or None
+        :param stats: an instrument.Stats, or None
+        :return: N/A
+    """
+    while process_command(command, train, journal, stats):
+        command = str(input("Enter a command: "))
+
+
+def run_script(lines, train, journal=None, stats=None):
+    """
+        processes commands from a file or stdin without prompting, until quit or the end of the input
+        pre-condition: lines is an iterable of command lines and a train has been created
+        post-condition: every command up to quit has been processed
+        :param lines: the command lines, such as an open file
+        :param train: the linked list which represents the train
+        :param journal: an open journal.Journal, or None
+        :param stats: an instrument.Stats, or None
+        :return: N/A
+    """
+    for line in lines:
+        if not process_command(line, train, journal, stats):
+            return
 
 
 def main():
     """
         initials the train(linked list), prints a welcome message, and compiles the program
+        with a file name argument, the commands are read from that file instead of being prompted for,
+        and "-" reads them from stdin.
+        "--state <folder>" first keeps the train in that folder, so it is restored on the next run, and
+        "--stats <file>" writes the command timings to that JSON file when the program quits
         pre-condition: train is made and command is an empty string
         post-condition: train is manipulated appropriately and it is used in the sim.
         string is filled
         :return: N/A
     """
     train = Entire_Train(None, 0, 0)
-    print("welcome to the train yard!")
-    command = str(input("Enter a command: "))
-    process_commands(command, train)
+    args = sys.argv[1:]
+    journal = None
+    stats = Stats()
+    stats_file = None
+    while args[:1] in (["--state"], ["--stats"]) and len(args) > 1:
+        if args[0] == "--state":
+            journal = open_journal(args[1], train)
+        else:
+            stats_file = args[1]
+        args = args[2:]
+    if args:
+        if args[0] == "-":
+            run_script(sys.stdin, train, journal, stats)
+        else:
+            with open(args[0]) as f:
+                run_script(f, train, journal, stats)
+    else:
+        print("welcome to the train yard!")
+        command = str(input("Enter a command: "))
+        process_commands(command, train, journal, stats)
+    if journal is not None:
+        close_journal(journal, train)
+    if stats_file is not None:
+        dump_stats(stats, train, stats_file)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,228 @@
+"""
+file: yard.py
+By: Isaac McKinney
+
+A train yard with many named trains. Commands are sent to one train by name, and started trains run
+together on a simulated clock, driven by an asyncio event loop and a priority queue of arrival events
+"""
+import asyncio
+import heapq
+import sys
+from dataclasses import dataclass, field
+
+from command_list import *
+from optimizer import OBJECTIVES, regroup
+from train_run import COMMANDS
+
+# the train commands that change a train's cars or speed, which a train out on a trip cannot take
+CHANGING_COMMANDS = {"add_car", "add_cars", "set_speed", "detach"}
+
+
+"""
+    a dataclass for a yard of trains
+    trains: maps each train name to its Entire_Train
+    clock: the simulated time in hours
+    events: a heap of (time, order, train name, Stop or Trip_Report) events that have not happened yet.
+    a Stop is the train arriving and unloading there, and the Trip_Report is the train finishing its trip
+    order: counts scheduled events, so events at the same time happen in the order they were scheduled
+    running: the names of the trains that are out on a trip
+"""
+@dataclass(frozen=False)
+class Yard:
+    trains: dict = field(default_factory=dict)
+    clock: float = 0.0
+    events: list = field(default_factory=list)
+    order: int = 0
+    running: set = field(default_factory=set)
+
+
+def schedule(yard, time, name, event):
+    """
+        puts an event on the yard's priority queue
+        :param yard: the Yard
+        :param time: the simulated hour the event happens at
+        :param name: the train the event is for
+        :param event: the Stop or Trip_Report
+        :return: N/A
+    """
+    heapq.heappush(yard.events, (time, yard.order, name, event))
+    yard.order += 1
+
+
+def depart(yard, name):
+    """
+        starts a train on its trip. the trip is worked out at once with simulate, and each stop is
+        scheduled at the time the train gets there: the separation time and then the travel time after
+        the stop before it
+        pre-condition: the train exists, is not running, has cars and a speed > 0
+        post-condition: the train is empty and running, and its events are on the queue
+        :param yard: the Yard
+        :param name: the train's name
+        :return: the Trip_Report of the trip
+    """
+    report = simulate(yard.trains[name])
+    time = yard.clock
+    for stop in report.stops:
+        time += stop.sep_time + stop.segment_time
+        schedule(yard, time, name, stop)
+    schedule(yard, time, name, report)
+    yard.running.add(name)
+    return report
+
+
+def happen(yard, log=None):
+    """
+        takes the next event off the queue, moves the clock to it and logs it
+        pre-condition: the queue is not empty
+        post-condition: the clock is at the event's time, and a finished train is no longer running
+        :param yard: the Yard
+        :param log: an optional function given a line describing the event, like print
+        :return: N/A
+    """
+    time, order, name, event = heapq.heappop(yard.events)
+    yard.clock = time
+    if isinstance(event, Stop):
+        if log is not None:
+            log("[" + str(round(time, 2)) + "] " + name + " arrives at " + str(event.destination) + " ("
+                + str(event.miles) + " miles) and unloads " + str(event.num_cars) + " cars")
+    else:
+        yard.running.discard(name)
+        if log is not None:
+            log("[" + str(round(time, 2)) + "] " + name + " finished its trip of "
+                + str(event.total_distance) + " miles in " + str(round(event.total_time, 2)) + " hours")
+
+
+async def run_yard(yard, hours=None, log=None, batch=1000):
+    """
+        advances every running train together on the simulated clock
+        all trains share one event queue, so there are no per-train threads or tasks, and the loop hands
+        control back to asyncio every batch events so reading commands is not held up
+        pre-condition: yard is passed in and hours is None or >= 0
+        post-condition: every event up to the new clock time has happened
+        :param yard: the Yard
+        :param hours: how far to move the clock, or None to run until every train is done
+        :param log: an optional function given a line for each event, like print
+        :param batch: how many events to handle between giving control back
+        :return: N/A
+    """
+    until = None if hours is None else yard.clock + hours
+    handled = 0
+    while yard.events and (until is None or yard.events[0][0] <= until):
+        happen(yard, log)
+        handled += 1
+        if handled % batch == 0:
+            await asyncio.sleep(0)
+    if until is not None:
+        yard.clock = until
+
+
+async def yard_command(yard, line, log=print):
+    """
+        process one yard command:
+            new < train >, < train > < train command >, run [< hours >], trains, clock, quit,
+            optimize < total | max > < seconds > < train > < train > ...
+        where a train command is any command from train_run.py, and start sends the train on its trip.
+        a running train only takes the commands that look at it, not the ones that change its cars or speed.
+        optimize splits the cars of the named trains across their engines so the trips add up to the
+        least time, or the last one finishes soonest, searching for at most about that many seconds
+        pre-condition: yard is passed in
+        post-condition: the command is processed
+        :param yard: the Yard
+        :param line: the command line
+        :param log: where output lines go, like print
+        :return: False if the command was quit, otherwise True
+    """
+    parts = line.split()
+    if not parts:
+        return True
+    action = parts[0]
+    try:
+        if action == "quit":
+            log("Ending Train Yard Simulation")
+            return False
+        if action == "new" and len(parts) == 2:
+            if parts[1] in yard.trains:
+                raise ValueError
+            yard.trains[parts[1]] = Entire_Train(None, 0, 0)
+        elif action == "run" and len(parts) <= 2:
+            hours = float(parts[1]) if len(parts) == 2 else None
+            if hours is not None and hours < 0:
+                raise ValueError
+            await run_yard(yard, hours, log)
+        elif action == "optimize" and len(parts) >= 4:
+            objective, seconds, names = parts[1], float(parts[2]), parts[3:]
+            if objective not in OBJECTIVES or seconds < 0 or len(set(names)) != len(names):
+                raise ValueError
+            for name in names:
+                if name not in yard.trains or name in yard.running or yard.trains[name].speed <= 0:
+                    raise ValueError
+            plan = regroup([yard.trains[name] for name in names], objective, seconds)
+            for name, hours in zip(names, plan.times):
+                log(name + ": " + str(train_size(yard.trains[name])) + " cars, "
+                    + str(round(hours, 2)) + " hours")
+            log("total time " + str(round(plan.total_time, 2)) + " hours, last train done after "
+                + str(round(plan.max_time, 2)) + " hours")
+        elif action == "clock" and len(parts) == 1:
+            log("the time is " + str(round(yard.clock, 2)) + " hours")
+        elif action == "trains" and len(parts) == 1:
+            for name, train in yard.trains.items():
+                log(name + ": " + str(train_size(train)) + " cars"
+                    + (", running" if name in yard.running else ""))
+        elif action in yard.trains and len(parts) >= 2:
+            train = yard.trains[action]
+            if parts[1] == "start":
+                if action in yard.running or train.head is None or train.speed <= 0 or len(parts) != 2:
+                    raise ValueError
+                depart(yard, action)
+            elif parts[1] in COMMANDS:
+                if action in yard.running and parts[1] in CHANGING_COMMANDS:
+                    raise ValueError
+                COMMANDS[parts[1]](parts[2:], train)
+            else:
+                log("Illegal Command Name: Command doesn't exist in database")
+        else:
+            log("Illegal Command Name: Command doesn't exist in database")
+    except ValueError:
+        log("Illegal Command Use or Form")
+    return True
+
+
+async def serve(yard, lines=None):
+    """
+        reads yard commands until quit or the end of the input
+        :param yard: the Yard
+        :param lines: an iterable of command lines, or None to prompt on stdin
+        :return: N/A
+    """
+    if lines is not None:
+        for line in lines:
+            if not await yard_command(yard, line):
+                return
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, input, "Enter a yard command: ")
+        if not await yard_command(yard, line):
+            return
+
+
+def main():
+    """
+        runs the yard, reading commands from the file named on the command line, "-" for stdin,
+        or by prompting when there is no argument
+        :return: N/A
+    """
+    yard = Yard()
+    print("welcome to the train yard!")
+    if len(sys.argv) > 1:
+        if sys.argv[1] == "-":
+            asyncio.run(serve(yard, sys.stdin))
+        else:
+            with open(sys.argv[1]) as f:
+                asyncio.run(serve(yard, f))
+    else:
+        asyncio.run(serve(yard))
+
+
+if __name__ == '__main__':
+    main()
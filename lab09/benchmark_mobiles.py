@@ -0,0 +1,413 @@
+"""
+file: benchmark_mobiles.py
+By: Isaac McKinney
+
+Times measuring generated mobiles with the separate weight, height, balance and width walks against the
+single compute_metrics walk in draw_mobiles.py, and times drawing them into an SVG file
+"""
+import gc
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import draw_mobiles
+import mobiles as mob
+
+
+def old_weight(the_mobile):
+    """
+        a stand-in for the weight walk of mobiles.py, used when that module has none
+        :param the_mobile: a Ball or Rod
+        :return: the total weight of the mobile
+    """
+    if isinstance(the_mobile, mob.Ball):
+        return the_mobile.Weight
+    return old_weight(the_mobile.Left_Mobile) + old_weight(the_mobile.Right_Mobile)
+
+
+def old_height(the_mobile):
+    """
+        a stand-in for the height walk of mobiles.py, used when that module has none
+        :param the_mobile: a Ball or Rod
+        :return: the height of the mobile
+    """
+    if isinstance(the_mobile, mob.Ball):
+        return the_mobile.Cord + the_mobile.Weight
+    return the_mobile.Cord + max(old_height(the_mobile.Left_Mobile), old_height(the_mobile.Right_Mobile))
+
+
+def old_is_balanced(the_mobile):
+    """
+        a stand-in for the balance check of mobiles.py, used when that module has none. like the usual
+        student solution it weighs both sides again at every rod
+        :param the_mobile: a Ball or Rod
+        :return: True if the mobile balances
+    """
+    if isinstance(the_mobile, mob.Ball):
+        return True
+    return (math.isclose(the_mobile.Left_arm * old_weight(the_mobile.Left_Mobile),
+                         the_mobile.Right_arm * old_weight(the_mobile.Right_Mobile))
+            and old_is_balanced(the_mobile.Left_Mobile) and old_is_balanced(the_mobile.Right_Mobile))
+
+
+def old_width_aux(the_mobile):
+    """
+        the recursive width_aux draw_mobiles.py was supplied with, kept to compare against
+        :param the_mobile: a Ball or Rod
+        :return: the width of the widest side of the mobile
+    """
+    if isinstance(the_mobile, mob.Ball):
+        return the_mobile.Weight
+    return max(the_mobile.Left_arm + old_width_aux(the_mobile.Left_Mobile),
+               the_mobile.Right_arm + old_width_aux(the_mobile.Right_Mobile))
+
+
+def old_compute_metrics(the_mobile, cache):
+    """
+        the recursive compute_metrics, kept to compare against
+        :param the_mobile: a Ball or Rod
+        :param cache: the dict to save each node's Metrics in, keyed by id
+        :return: the Metrics of the mobile
+    """
+    key = id(the_mobile)
+    if key in cache:
+        return cache[key]
+    if isinstance(the_mobile, mob.Ball):
+        metrics = draw_mobiles.Metrics(the_mobile.Weight, the_mobile.Cord + the_mobile.Weight,
+                                       the_mobile.Weight, True)
+    else:
+        left = old_compute_metrics(the_mobile.Left_Mobile, cache)
+        right = old_compute_metrics(the_mobile.Right_Mobile, cache)
+        metrics = draw_mobiles.Metrics(left.weight + right.weight,
+                                       the_mobile.Cord + max(left.height, right.height),
+                                       max(the_mobile.Left_arm + left.widest, the_mobile.Right_arm + right.widest),
+                                       left.balanced and right.balanced
+                                       and math.isclose(the_mobile.Left_arm * left.weight,
+                                                        the_mobile.Right_arm * right.weight))
+    cache[key] = metrics
+    return metrics
+
+
+def old_draw_mobile(the_mobile):
+    """
+        the recursive draw_mobile and draw_rod, kept to compare turtle paths against
+        :param the_mobile: a Ball or Rod
+        :return: N/A
+    """
+    tt = draw_mobiles.tt
+    if isinstance(the_mobile, mob.Ball):
+        draw_mobiles.draw_ball(the_mobile.Cord, the_mobile.Weight)
+        return
+    draw_mobiles.draw_cord(the_mobile.Cord)
+    tt.right(90)
+    tt.forward(the_mobile.Left_arm)
+    tt.write(format(the_mobile.Left_arm, ".2f"), False, 'center', ('Arial', 12, 'bold'))
+    tt.left(90)
+    old_draw_mobile(the_mobile.Left_Mobile)
+    tt.left(90)
+    tt.forward(the_mobile.Left_arm + the_mobile.Right_arm)
+    tt.write(format(the_mobile.Right_arm, ".2f"), False, 'center', ('Arial', 12, 'bold'))
+    tt.right(90)
+    old_draw_mobile(the_mobile.Right_Mobile)
+    tt.left(90)
+    tt.forward(- the_mobile.Right_arm)
+    tt.right(90)
+    tt.forward(- the_mobile.Cord)
+
+
+class Path_Recorder:
+    """
+        stands in for the turtle module so drawings can be compared without a screen.
+        every turtle call is written down with its arguments, unless keep is False so only the drawing
+        code itself is timed
+    """
+    def __init__(self, keep=True):
+        self.calls = []
+        self.keep = keep
+
+    def __getattr__(self, name):
+        def record(*args):
+            if self.keep:
+                self.calls.append((name,) + args)
+        return record
+
+
+def make_mobile(num_nodes, seed, shape="random"):
+    """
+        makes a balanced mobile. each rod's arms are the weights of the opposite sides, so it always balances
+        :param num_nodes: about how many balls and rods the mobile has, rounded up to an odd number
+        :param seed: the random seed so runs can be repeated
+        :param shape: "random" joins random pairs of mobiles, so the mobile is bushy, and "chain" hangs each
+        ball from the rod below it, so the mobile is as deep as it can be
+        :return: the mobile
+    """
+    rng = random.Random(seed)
+    # each part is a mobile and its weight
+    parts = []
+    for _ in range(num_nodes // 2 + 1):
+        ball = mob.Ball(Cord=rng.randint(1, 20), Weight=rng.randint(1, 10))
+        parts.append((ball, ball.Weight))
+    while len(parts) > 1:
+        if shape == "chain":
+            left, right = parts.pop(), parts.pop()
+        else:
+            spot = rng.randrange(len(parts))
+            parts[spot], parts[-1] = parts[-1], parts[spot]
+            left = parts.pop()
+            spot = rng.randrange(len(parts))
+            parts[spot], parts[-1] = parts[-1], parts[spot]
+            right = parts.pop()
+        rod = mob.Rod(Cord=rng.randint(1, 20), Left_arm=right[1], Left_Mobile=left[0],
+                      Right_arm=left[1], Right_Mobile=right[0])
+        parts.append((rod, left[1] + right[1]))
+    return parts[0][0]
+
+
+def reference_walks():
+    """
+        picks what compute_metrics is checked and timed against: the weight, height and is_balanced of
+        mobiles.py when it has them, and the stand-ins above when it does not
+        :return: the weight, height and is_balanced functions, and where they came from
+    """
+    if all(callable(getattr(mob, name, None)) for name in ("weight", "height", "is_balanced")):
+        return mob.weight, mob.height, mob.is_balanced, "mobiles.py"
+    return old_weight, old_height, old_is_balanced, "stand-ins"
+
+
+def bench_metrics(sizes, shape):
+    """
+        measures generated mobiles with reference_walks and old_width_aux and with compute_metrics,
+        checks they agree and prints the times
+        pre-condition: chains fit under the recursion limit
+        post-condition: the times are printed
+        :param sizes: the node counts to try
+        :param shape: the mobile shape, the same as make_mobile
+        :return: N/A
+    """
+    weight, height, is_balanced, source = reference_walks()
+    for size in sizes:
+        the_mobile = make_mobile(size, size, shape)
+        began = time.perf_counter()
+        old = (is_balanced(the_mobile), weight(the_mobile), height(the_mobile), 2 * old_width_aux(the_mobile))
+        old_time = time.perf_counter() - began
+        began = time.perf_counter()
+        cache = {}
+        metrics = draw_mobiles.compute_metrics(the_mobile, cache)
+        new = (metrics.balanced, metrics.weight, metrics.height, draw_mobiles.width(the_mobile, cache))
+        new_time = time.perf_counter() - began
+        if old[0] != new[0] or not all(math.isclose(a, b) for a, b in zip(old[1:], new[1:])):
+            raise AssertionError("compute_metrics measured " + str(new) + " instead of " + str(old)
+                                 + " from " + source)
+        print("metrics " + shape + " nodes=" + str(size) + " " + source + "=" + format(old_time, ".4f") + "s new="
+              + format(new_time, ".4f") + "s speedup=" + format(old_time / max(new_time, 1e-9), ".1f") + "x")
+
+
+def run_deep(function, *args):
+    """
+        runs a recursive function in a thread with a big stack and recursion limit, so the old versions can
+        finish on deep chains to be compared against
+        :param function: the function to run
+        :param args: its arguments
+        :return: what the function returned
+    """
+    result = []
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10 ** 7)
+    threading.stack_size(2 ** 30)
+    worker = threading.Thread(target=lambda: result.append(function(*args)))
+    try:
+        worker.start()
+        worker.join()
+    finally:
+        threading.stack_size(0)
+        sys.setrecursionlimit(limit)
+    if not result:
+        raise AssertionError(function.__name__ + " did not finish")
+    return result[0]
+
+
+def memory_status(name):
+    """
+        helper function that reads one of the memory lines of /proc/self/status
+        :param name: the line's name, like "VmRSS" for the resident memory or "VmHWM" for its peak
+        :return: the value in bytes
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(name + ":"):
+                return int(line.split()[1]) * 1024
+    raise ValueError("no " + name + " in /proc/self/status")
+
+
+def peak_growth(work, connection):
+    """
+        runs in a forked child: resets the peak resident memory to what is resident now, does the work and
+        sends back how far the peak grew above that, or None if the peak can not be reset
+        :param work: a function with no arguments
+        :param connection: the end of the pipe to send the answer through
+        :return: N/A
+    """
+    growth = None
+    try:
+        # keep the collector off the objects inherited from the parent, so their pages are not copied
+        gc.freeze()
+        # writing 5 to clear_refs sets VmHWM back down to VmRSS
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        base = memory_status("VmRSS")
+        work()
+        growth = memory_status("VmHWM") - base
+    except OSError:
+        pass
+    finally:
+        connection.send(growth)
+
+
+def seconds_of(work):
+    """
+        helper function that times some work
+        :param work: a function with no arguments
+        :return: the seconds it took
+    """
+    began = time.perf_counter()
+    work()
+    return time.perf_counter() - began
+
+
+def peak_of(work):
+    """
+        runs some work in a forked child to find its peak memory
+        the peak is how far the child's resident memory grew, so it counts the stack the recursive versions
+        use, which tracemalloc does not see. memory the parent freed but still holds is reused without
+        growing, so work compared this way has to be forked from the same parent state
+        :param work: a function with no arguments that does the work from the start each time
+        :return: the peak bytes, or None when it could not be measured
+    """
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(False)
+    child = context.Process(target=peak_growth, args=(work, sender))
+    child.start()
+    peak = receiver.recv()
+    child.join()
+    return peak
+
+
+def megabytes(size):
+    """
+        helper function that formats a peak from peak_of
+        :param size: the peak in bytes from peak_of, or None
+        :return: the peak in MB, or "n/a"
+    """
+    if size is None:
+        return "n/a"
+    return format(size / 1e6, ".1f") + " MB"
+
+
+def bench_deep(depths):
+    """
+        checks the explicit stack compute_metrics and draw_mobile on chains as deep as depths, against the
+        recursive versions run with a big stack, and prints the time and peak memory of both
+        the turtle is swapped for a Path_Recorder, so the drawing checks need no screen. the four peaks of
+        a chain are measured first, so every child is forked from the same state
+        pre-condition: depths is a list of rod counts
+        post-condition: the results are printed, and an AssertionError is raised if anything differs
+        :param depths: how many rods deep each chain is
+        :return: N/A
+    """
+    turtle = draw_mobiles.tt
+    try:
+        for depth in depths:
+            the_mobile = make_mobile(2 * depth + 1, depth, "chain")
+            draw_mobiles.tt = Path_Recorder(False)
+            works = [lambda: draw_mobiles.compute_metrics(the_mobile, {}),
+                     lambda: run_deep(old_compute_metrics, the_mobile, {}),
+                     lambda: draw_mobiles.draw_mobile(the_mobile),
+                     lambda: run_deep(old_draw_mobile, the_mobile)]
+            gc.collect()
+            peaks = [peak_of(work) for work in works]
+            try:
+                old_compute_metrics(the_mobile, {})
+                default_limit = "ok"
+            except RecursionError:
+                default_limit = "RecursionError"
+            new_cache, old_cache = {}, {}
+            draw_mobiles.compute_metrics(the_mobile, new_cache)
+            run_deep(old_compute_metrics, the_mobile, old_cache)
+            if new_cache != old_cache:
+                raise AssertionError("compute_metrics differs from the recursive version at depth " + str(depth))
+            print("metrics depth=" + str(depth) + " recursive at the default limit: " + default_limit
+                  + " | stack " + format(seconds_of(works[0]), ".3f") + "s peak " + megabytes(peaks[0])
+                  + " | recursive " + format(seconds_of(works[1]), ".3f") + "s peak " + megabytes(peaks[1]))
+            new_path, old_path = Path_Recorder(), Path_Recorder()
+            draw_mobiles.tt = new_path
+            draw_mobiles.draw_mobile(the_mobile)
+            draw_mobiles.tt = old_path
+            run_deep(old_draw_mobile, the_mobile)
+            if new_path.calls != old_path.calls:
+                raise AssertionError("draw_mobile moved the turtle differently at depth " + str(depth))
+            draw_mobiles.tt = Path_Recorder(False)
+            print("drawing depth=" + str(depth) + " turtle calls=" + str(len(new_path.calls))
+                  + " | stack " + format(seconds_of(works[2]), ".3f") + "s peak " + megabytes(peaks[2])
+                  + " | recursive " + format(seconds_of(works[3]), ".3f") + "s peak " + megabytes(peaks[3]))
+    finally:
+        draw_mobiles.tt = turtle
+
+
+def bench_svg(sizes):
+    """
+        times writing generated mobiles to an SVG file, next to just making the turtle calls for them
+        the turtle calls go to a Path_Recorder, so a real turtle window would be much slower still
+        :param sizes: the node counts to try
+        :return: N/A
+    """
+    turtle = draw_mobiles.tt
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "mobile.svg")
+        for shape in ("random", "chain"):
+            for size in sizes:
+                the_mobile = make_mobile(size, size, shape)
+                draw_mobiles.tt = Path_Recorder(False)
+                began = time.perf_counter()
+                draw_mobiles.draw_mobile(the_mobile)
+                turtle_time = time.perf_counter() - began
+                draw_mobiles.tt = turtle
+                began = time.perf_counter()
+                renderer = draw_mobiles.SVG_Renderer(path)
+                renderer.start(1000, 1000)
+                renderer.draw(the_mobile)
+                renderer.finish()
+                svg_time = time.perf_counter() - began
+                print("svg " + shape + " nodes=" + str(size) + " turtle_calls=" + format(turtle_time, ".4f")
+                      + "s svg=" + format(svg_time, ".4f") + "s file=" + str(os.path.getsize(path) // 1024)
+                      + "KB")
+
+
+def main():
+    """
+        runs the benchmark from the command line
+        usage: benchmark_mobiles.py [size ...] | deep [depth ...] | svg [size ...]
+        chains stop at 10^4 nodes, because the old balance check weighs the whole rest of a chain at every
+        rod and would take hours at 10^5
+        :return: N/A
+    """
+    if sys.argv[1:2] == ["deep"]:
+        bench_deep([int(depth) for depth in sys.argv[2:]] or [10 ** 3, 10 ** 4, 10 ** 5])
+        return
+    if sys.argv[1:2] == ["svg"]:
+        bench_svg([int(size) for size in sys.argv[2:]] or [10 ** 3, 10 ** 4, 10 ** 5])
+        return
+    sizes = [int(size) for size in sys.argv[1:]] or [10 ** 3, 10 ** 4, 10 ** 5]
+    chain_sizes = [size for size in sizes if size <= 10 ** 4]
+    # the old walks recurse once per level, and a chain is one level per rod
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * max(chain_sizes, default=0) + 1000))
+    bench_metrics(sizes, "random")
+    bench_metrics(chain_sizes, "chain")
+
+
+if __name__ == '__main__':
+    main()
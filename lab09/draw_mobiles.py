@@ -1,16 +1,23 @@
 """
 file: draw_mobiles.py
-description: main program to draw mobiles using turtle
+description: main program to draw mobiles using turtle, or into an SVG file
 language: python3
 author: CS.RIT.EDU
 date: 10/2015. updated 11/2019
 purpose: supplied code for a solution to tree mobiles lab
 """
 
+import math           # for isclose, to compare the torques of a Rod
 import sys            # for command line args
-import tkinter as tk  # to get the screen width and height
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
 
-import turtle as tt
+try:
+    import tkinter as tk  # to get the screen width and height
+    import turtle as tt
+except ImportError:       # only the turtle renderer needs them
+    tk = None
+    tt = None
 
 import mobiles as mob  # this is the student's module
 
@@ -19,6 +26,8 @@ def get_screen_info():
     get_screen_info : Void -> Tuple( width, height )
     return the screen dimensions
     """
+    if tk is None:
+        raise ImportError( "tkinter is needed to get the screen size" )
     root = tk.Tk()
     screen_width = root.winfo_screenwidth()
     screen_height = root.winfo_screenheight()
@@ -96,6 +105,24 @@ def draw_rod( leftmobile, leftarm, cordlen, rightarm, rightmobile ):
     post-conditions: turtle end position, orientation match the start.
     """
 
+    draw_rod_left( cordlen, leftarm )
+    draw_mobile( leftmobile )
+    draw_rod_right( leftarm, rightarm )
+    draw_mobile( rightmobile )
+    draw_rod_end( cordlen, rightarm )
+
+
+def draw_rod_left( cordlen, leftarm ):
+    """
+    draw_rod_left : Natural Natural -> NoneType
+    draw_rod_left draws a Rod's cord and left arm.
+
+    pre-conditions: turtle start position is the Rod's 'cord hang point'
+                    and orientation heading is South on the canvas.
+    post-conditions: turtle is at the hang point of the left
+                     submobile, heading South.
+    """
+
     draw_cord( cordlen )
     tt.right( 90 )
     # left side
@@ -103,7 +130,19 @@ def draw_rod( leftmobile, leftarm, cordlen, rightarm, rightmobile ):
     tt.write( format( leftarm, ".2f" ), False \
             , 'center', ('Arial', 12, 'bold' ) )
     tt.left( 90 )
-    draw_mobile( leftmobile )  # recurse indirectly
+
+
+def draw_rod_right( leftarm, rightarm ):
+    """
+    draw_rod_right : Natural Natural -> NoneType
+    draw_rod_right draws a Rod's right arm once the left side is done.
+
+    pre-conditions: turtle is at the hang point of the left
+                    submobile, heading South.
+    post-conditions: turtle is at the hang point of the right
+                     submobile, heading South.
+    """
+
     tt.left( 90 )
 
     # then right side
@@ -111,7 +150,20 @@ def draw_rod( leftmobile, leftarm, cordlen, rightarm, rightmobile ):
     tt.write( format( rightarm, ".2f" ), False \
             , 'center', ('Arial', 12, 'bold' ) )
     tt.right( 90 )
-    draw_mobile( rightmobile )  # recurse indirectly
+
+
+def draw_rod_end( cordlen, rightarm ):
+    """
+    draw_rod_end : Natural Natural -> NoneType
+    draw_rod_end goes back up to a Rod's cord hang point once
+    both sides are done.
+
+    pre-conditions: turtle is at the hang point of the right
+                    submobile, heading South.
+    post-conditions: turtle end position, orientation match the
+                     start of draw_rod_left.
+    """
+
     tt.left( 90 )
     tt.forward( - rightarm )
     # then back up to the cord hang point of this Rod
@@ -128,31 +180,130 @@ def draw_mobile( the_mobile ):
     exception with the message 'not a valid mobile {mobile}',
     where {mobile} is the string representation of the_mobile.
 
+    The Rods are drawn in three parts kept on an explicit stack
+    instead of by recursion, so a mobile of any depth can be drawn.
+    The turtle moves exactly as it would calling draw_rod on each Rod.
+
     pre-conditions: turtle pen is down to draw starting with the cord.
     pre-conditions: turtle start position is the 'cord hang point'
                     and orientation heading is South on the canvas.
     post-conditions: turtle end position, orientation match the start.
     """
 
-    if isinstance( the_mobile, mob.Ball ):
-        draw_ball( the_mobile.Cord, the_mobile.Weight )
+    # each entry is the part to draw next: a whole mobile, or the right
+    # side or the end of a Rod once the submobile before it is done
+    stack = [ ( "mobile", the_mobile ) ]
+    while stack:
+        part, entry = stack.pop()
 
-    elif isinstance( the_mobile, mob.Rod ):
-        draw_rod( the_mobile.Left_Mobile    \
-                , the_mobile.Left_arm       \
-                , the_mobile.Cord          \
-                , the_mobile.Right_arm      \
-                , the_mobile.Right_Mobile )
+        if part == "right":
+            draw_rod_right( entry.Left_arm, entry.Right_arm )
 
-    else:
-        raise Exception( "Error: Not a valid mobile\n\t" + \
-                         str( the_mobile ) )
+        elif part == "end":
+            draw_rod_end( entry.Cord, entry.Right_arm )
+
+        elif isinstance( entry, mob.Ball ):
+            draw_ball( entry.Cord, entry.Weight )
+
+        elif isinstance( entry, mob.Rod ):
+            draw_rod_left( entry.Cord, entry.Left_arm )
+            stack.append( ( "end", entry ) )
+            stack.append( ( "mobile", entry.Right_Mobile ) )
+            stack.append( ( "right", entry ) )
+            stack.append( ( "mobile", entry.Left_Mobile ) )
+
+        else:
+            raise Exception( "Error: Not a valid mobile\n\t" + \
+                             str( entry ) )
     return
 
 
-def width( the_mobile ) :
+@dataclass( slots=True )
+class Metrics:
+    """
+    Metrics : the measurements of one mobile, made by compute_metrics
+        weight: the total weight of the balls hanging from it
+        height: from its hang point to the bottom of its lowest ball
+        widest: the width of its widest side, as width_aux returns
+        balanced: True if it and every mobile hanging below it balance
+    """
+    weight: float
+    height: float
+    widest: float
+    balanced: bool
+
+
+def compute_metrics( the_mobile, cache=None ):
     """
-    width : the_mobile -> Number
+    compute_metrics : the_mobile Dict -> Metrics
+    return the weight, height, widest side and balance of the_mobile.
+    One post-order walk measures every mobile below it, and each
+    Rod is built from the Metrics of its two submobiles, so no
+    subtree is walked twice, even when checking balance.
+    The walk keeps its own stack instead of recursing, so deep
+    mobiles do not hit the recursion limit.
+    A Ball is as high as its cord plus its diameter (its weight).
+    A Rod balances when Left_arm * left weight equals
+    Right_arm * right weight and both submobiles balance.
+    The lengths and weights are read from files, so the two
+    products are compared with math.isclose instead of ==.
+
+    If cache is given, the Metrics of every mobile in the_mobile
+    is saved in it, keyed by id( mobile ), and mobiles already in
+    it are not measured again, so reporting and drawing can reuse them.
+
+    If the_mobile is not valid, then raise an exception
+    with the message 'not a valid mobile {mobile}',
+
+    pre-conditions: the_mobile is a proper mobile instance.
+    """
+
+    if cache is None:
+        cache = {}
+
+    # a Rod stays on the stack until both its submobiles are measured
+    stack = [ the_mobile ]
+    while stack:
+        node = stack[ -1 ]
+        key = id( node )
+        if key in cache:
+            stack.pop()
+
+        elif isinstance( node, mob.Ball ):
+            cache[ key ] = Metrics( node.Weight \
+                                  , node.Cord + node.Weight \
+                                  , node.Weight \
+                                  , True )
+            stack.pop()
+
+        elif isinstance( node, mob.Rod ):
+            left = cache.get( id( node.Left_Mobile ) )
+            right = cache.get( id( node.Right_Mobile ) )
+            if left is None or right is None:
+                if right is None:
+                    stack.append( node.Right_Mobile )
+                if left is None:
+                    stack.append( node.Left_Mobile )
+                continue
+            cache[ key ] = Metrics( left.weight + right.weight \
+                                  , node.Cord + max( left.height, right.height ) \
+                                  , max( node.Left_arm + left.widest \
+                                       , node.Right_arm + right.widest ) \
+                                  , left.balanced and right.balanced \
+                                    and math.isclose( node.Left_arm * left.weight \
+                                                    , node.Right_arm * right.weight ) )
+            stack.pop()
+
+        else:
+            raise Exception( "Error: Not a valid mobile\n\t" + \
+                             str( node ) )
+
+    return cache[ id( the_mobile ) ]
+
+
+def width( the_mobile, cache=None ) :
+    """
+    width : the_mobile Dict -> Number
     return the width of the the_mobile.
     If the mobile is a simple Ball, then the width is the diameter.
     Remember that the ball's weight also represents its diameter.
@@ -166,13 +317,14 @@ def width( the_mobile ) :
     To account for this spinning, this function needs to
     identify the width of the widest side and use that as
     the width of both sides of the mobile.
+    cache is the same as in compute_metrics.
     """
 
-    return 2 * width_aux( the_mobile )
+    return 2 * width_aux( the_mobile, cache )
  
-def width_aux( the_mobile ) :
+def width_aux( the_mobile, cache=None ) :
     """
-    width_aux : the_mobile -> Number
+    width_aux : the_mobile Dict -> Number
     return the width of the widest side of the_mobile.
     If the mobile is a simple Ball, then the width is the diameter.
     Remember that the ball's weight also represents its diameter.
@@ -184,30 +336,232 @@ def width_aux( the_mobile ) :
     If the_mobile is not valid, then raise an exception
     with the message 'not a valid mobile {mobile}',
 
+    The widest side is one of the Metrics from compute_metrics,
+    so it is read from cache when the mobile was already measured.
+
     pre-conditions: the_mobile is a proper mobile instance.
     """
 
-    if isinstance( the_mobile, mob.Ball ):
-        return the_mobile.Weight
+    return compute_metrics( the_mobile, cache ).widest
+
+
+#########################################################
+# renderers: where a mobile gets drawn
+#########################################################
+
+class Renderer( ABC ):
+    """
+    Renderer : the interface process_mobile_file draws through.
+    process_mobile_file calls start, then draw, then finish.
+    """
+
+    @abstractmethod
+    def start( self, wide, high ):
+        """
+        start : Number Number -> NoneType
+        start sets up a canvas wide by high with the origin
+        at its top-center, ready to hang a mobile from.
+        """
 
-    elif isinstance( the_mobile, mob.Rod ):
+    @abstractmethod
+    def draw( self, the_mobile ):
+        """
+        draw : the_mobile -> NoneType
+        draw draws the_mobile hanging from the origin.
+        If the_mobile is not valid, then raise an exception
+        with the message 'not a valid mobile {mobile}',
 
-        lwide = the_mobile.Left_arm + width_aux( the_mobile.Left_Mobile )
-        rwide = the_mobile.Right_arm + width_aux( the_mobile.Right_Mobile )
-        return max( rwide, lwide ) 
+        pre-conditions: start was called.
+        """
 
-    # else unconditionally raise exception for any other case.
-    raise Exception( "Error: Not a valid mobile\n\t" + str( the_mobile ) )
+    @abstractmethod
+    def finish( self ):
+        """
+        finish : Void -> NoneType
+        finish shows or saves the drawing.
 
+        pre-conditions: draw was called.
+        """
 
-def process_mobile_file( screen_width, screen_height, fname ):
+
+class Turtle_Renderer( Renderer ):
+    """
+    Turtle_Renderer : draws the mobile step by step with turtle
+    in a window, using init_canvas and draw_mobile.
     """
-    process_mobile_file : Natural Natural String -> NoneType
+
+    def start( self, wide, high ):
+        """
+        start : Number Number -> NoneType
+        start sets up the turtle canvas with init_canvas.
+        If turtle could not be imported, then raise ImportError.
+
+        pre-conditions: wide and high are less than the screen size.
+        post-conditions: size 2 pen is down at origin, facing South.
+        """
+        if tt is None:
+            raise ImportError( "tkinter is needed to draw with turtle" )
+        init_canvas( wide, high )
+
+    def draw( self, the_mobile ):
+        """
+        draw : the_mobile -> NoneType
+        draw moves the turtle over the_mobile with draw_mobile.
+
+        pre-conditions: start was called.
+        post-conditions: turtle end position, orientation match the start.
+        """
+        draw_mobile( the_mobile )
+
+    def finish( self ):
+        """
+        finish : Void -> NoneType
+        finish does nothing, the drawing is already in the window.
+        """
+        return
+
+
+class SVG_Renderer( Renderer ):
+    """
+    SVG_Renderer : lays out the whole mobile with svg_mobile and
+    writes it to an SVG file, without opening a window.
+        fname: the SVG file to write
+        wide, high: the canvas size given to start
+        elements: the SVG elements drawn so far
+    """
+
+    def __init__( self, fname ):
+        """
+        __init__ : String -> NoneType
+        make a renderer that writes to the file fname.
+        """
+        self.fname = fname
+        self.wide = 0
+        self.high = 0
+        self.elements = []
+
+    def start( self, wide, high ):
+        """
+        start : Number Number -> NoneType
+        start keeps the canvas size and forgets any earlier drawing.
+        """
+        self.wide = wide
+        self.high = high
+        self.elements = []
+
+    def draw( self, the_mobile ):
+        """
+        draw : the_mobile -> NoneType
+        draw lays out the_mobile with svg_mobile and keeps
+        its elements for finish.
+        If the_mobile is not valid, then raise an exception
+        with the message 'not a valid mobile {mobile}',
+
+        pre-conditions: start was called.
+        """
+        self.elements.extend( svg_mobile( the_mobile ) )
+
+    def finish( self ):
+        """
+        finish : Void -> NoneType
+        finish writes the SVG file, using the same world coordinates
+        as init_canvas but with y growing downwards.
+
+        pre-conditions: draw was called.
+        post-conditions: fname holds the drawing.
+        """
+        margin = 10
+        with open( self.fname, "w" ) as f:
+            f.write( '<svg xmlns="http://www.w3.org/2000/svg"' \
+                   + ' width="' + format( self.wide, ".2f" ) + '"' \
+                   + ' height="' + format( self.high, ".2f" ) + '"' \
+                   + ' viewBox="' + format( - self.wide / 2, ".2f" ) \
+                   + ' ' + format( - margin, ".2f" ) \
+                   + ' ' + format( self.wide, ".2f" ) \
+                   + ' ' + format( self.high + margin, ".2f" ) + '">\n' )
+            f.write( '<g stroke="black" stroke-width="2" fill="none"' \
+                   + ' font-family="Arial" font-size="12"' \
+                   + ' font-weight="bold">\n' )
+            f.write( "\n".join( self.elements ) )
+            f.write( "\n</g>\n</svg>\n" )
+
+
+def svg_mobile( the_mobile ):
+    """
+    svg_mobile : the_mobile -> List( String )
+    return the SVG elements that draw the_mobile hanging from (0, 0),
+    the lines, circles and labels draw_mobile would draw with turtle.
+    The position of every hang point is worked out in one walk
+    with an explicit stack, so the turtle is never moved back up
+    and a mobile of any depth can be laid out.
+    SVG y grows downwards, so a cord of length c hanging from
+    (x, y) ends at (x, y + c).
+
+    If any of the components of the_mobile is not
+    either a Ball or a Rod object, then raise an
+    exception with the message 'not a valid mobile {mobile}',
+    """
+
+    elements = []
+    add = elements.append
+    stack = [ ( the_mobile, 0.0, 0.0 ) ]
+    while stack:
+        node, x, y = stack.pop()
+
+        if not isinstance( node, mob.Ball ) \
+        and not isinstance( node, mob.Rod ):
+            raise Exception( "Error: Not a valid mobile\n\t" + \
+                             str( node ) )
+
+        # the cord, with its length written half-way down
+        cordlen = node.Cord
+        bottom = y + cordlen
+        xs = format( x, ".2f" )
+        add( '<line x1="' + xs + '" y1="' + format( y, ".2f" ) \
+           + '" x2="' + xs + '" y2="' + format( bottom, ".2f" ) + '"/>' )
+        add( '<text x="' + xs + '" y="' + format( y + cordlen / 2, ".2f" ) \
+           + '" stroke="none" fill="black">' \
+           + format( cordlen, " .2f" ) + '</text>' )
+
+        if isinstance( node, mob.Ball ):
+            # weight is represented by the diameter
+            weight = node.Weight
+            add( '<text x="' + xs + '" y="' + format( bottom, ".2f" ) \
+               + '" stroke="none" fill="black">' \
+               + format( weight, " .2f" ) + '</text>' )
+            add( '<circle cx="' + xs \
+               + '" cy="' + format( bottom + weight / 2, ".2f" ) \
+               + '" r="' + format( weight / 2, ".2f" ) + '"/>' )
+
+        else:
+            # the rod, with each arm's length written at its end
+            left = x - node.Left_arm
+            right = x + node.Right_arm
+            ys = format( bottom, ".2f" )
+            add( '<line x1="' + format( left, ".2f" ) + '" y1="' + ys \
+               + '" x2="' + format( right, ".2f" ) + '" y2="' + ys + '"/>' )
+            add( '<text x="' + format( left, ".2f" ) + '" y="' + ys \
+               + '" stroke="none" fill="black" text-anchor="middle">' \
+               + format( node.Left_arm, ".2f" ) + '</text>' )
+            add( '<text x="' + format( right, ".2f" ) + '" y="' + ys \
+               + '" stroke="none" fill="black" text-anchor="middle">' \
+               + format( node.Right_arm, ".2f" ) + '</text>' )
+            stack.append( ( node.Right_Mobile, right, bottom ) )
+            stack.append( ( node.Left_Mobile, left, bottom ) )
+
+    return elements
+
+
+def process_mobile_file( screen_width, screen_height, fname, renderer=None ):
+    """
+    process_mobile_file : Number Number String Renderer -> NoneType
     process_mobile_file processes the mobile found in fname by
     constructing it, and displaying it within the limits of
     a canvas size less than or equal to the screen's width and height.
+    The mobile is drawn by renderer, a Turtle_Renderer by default.
     Procedure:
         - read the mobile file, which builds the mobile.
+        - measure the whole mobile once with compute_metrics.
         - print whether or not the mobile is balanced.
         - print the weight of the mobile.
         - print the width and height of the mobile.
@@ -222,20 +576,25 @@ def process_mobile_file( screen_width, screen_height, fname ):
     if isinstance( the_mobile, mob.Ball ) \
     or isinstance( the_mobile, mob.Rod ):
 
+        cache = {}
+        metrics = compute_metrics( the_mobile, cache )
         print( "file:", fname )
-        print( "is balanced? :", mob.is_balanced( the_mobile ) ) 
-        print( "weight:", mob.weight( the_mobile ) ) 
-        high = mob.height( the_mobile )
-        wide = width( the_mobile )
+        print( "is balanced? :", metrics.balanced ) 
+        print( "weight:", metrics.weight ) 
+        high = metrics.height
+        wide = width( the_mobile, cache )
         print( 'width X height:', wide, 'X', high )
         # set the canvas size so most of the mobile is visible.
         # Note that mobiles with one very long side arm
         # might not fully display without canvas enlargement.
         cwidth, cheight = ( wide * 1.2, high * 1.2 )
         print( 'canvas size (w x h):', cwidth, 'X', cheight )
-        init_canvas( min( cwidth, screen_width ) \
-                  , min( cheight, screen_height ) )
-        draw_mobile( the_mobile ) 
+        if renderer is None:
+            renderer = Turtle_Renderer()
+        renderer.start( min( cwidth, screen_width ) \
+                      , min( cheight, screen_height ) )
+        renderer.draw( the_mobile )
+        renderer.finish()
 
     else:
         print( fname, "did not contain a valid mobile" ) 
@@ -252,8 +611,20 @@ def main():
         - prompts for name of file containing one mobile description.
         -- if the name is the empty string, the program ends.
         - processes the mobile file in process_mobile_file.
+    Run as 'draw_mobiles.py --svg out.svg [mobile file]' to write
+    the drawing to out.svg instead, which does not need tkinter.
     """
 
+    if sys.argv[ 1:2 ] == [ "--svg" ] and len( sys.argv ) > 2:
+        if len( sys.argv ) > 3:
+            fname = sys.argv[ 3 ]
+        else:
+            fname = input( "Enter a Mobile file name(hit enter to quit): " )
+        if fname != "":
+            process_mobile_file( float( "inf" ), float( "inf" ), fname \
+                               , SVG_Renderer( sys.argv[ 2 ] ) )
+        return
+
     while True:
         fname = input( "Enter a Mobile file name(hit enter to quit): " )
         if fname == "":
@@ -0,0 +1,115 @@
+"""
+file: test_draw_mobiles.py
+By: Isaac McKinney
+
+Checks the stack based walks of draw_mobiles.py against the recursive ones they replaced, on a chain far
+deeper than the recursion limit. A small Ball and Rod stand in for the student's mobiles.py, so the checks
+run without it. Run with: python -m pytest -q
+"""
+import sys
+import types
+from dataclasses import dataclass
+
+import pytest
+
+
+# how many rods the chain hangs from one another
+DEPTH = 10 ** 5
+
+
+@dataclass
+class Ball:
+    Cord: float
+    Weight: float
+
+
+@dataclass
+class Rod:
+    Cord: float
+    Left_arm: float
+    Left_Mobile: object
+    Right_arm: float
+    Right_Mobile: object
+
+
+# draw_mobiles.py imports mobiles when it is loaded, so the stand-in has to be registered first
+mobiles = types.ModuleType("mobiles")
+mobiles.Ball = Ball
+mobiles.Rod = Rod
+sys.modules["mobiles"] = mobiles
+
+import benchmark_mobiles  # noqa: E402
+import draw_mobiles  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def chain():
+    """
+        a balanced mobile where each rod hangs from the rod above it, DEPTH rods deep
+        :return: the mobile
+    """
+    the_mobile = benchmark_mobiles.make_mobile(2 * DEPTH + 1, 1, "chain")
+    rods = 0
+    node = the_mobile
+    while isinstance(node, Rod):
+        rods += 1
+        node = node.Left_Mobile
+    assert rods == DEPTH > sys.getrecursionlimit()
+    return the_mobile
+
+
+def recursive_draw_mobile(the_mobile):
+    """
+        the supplied draw_mobile, which draws each Rod by calling draw_rod, and draw_rod calls it back
+        for both submobiles
+        :param the_mobile: a Ball or Rod
+        :return: N/A
+    """
+    if isinstance(the_mobile, Ball):
+        draw_mobiles.draw_ball(the_mobile.Cord, the_mobile.Weight)
+    else:
+        draw_mobiles.draw_rod(the_mobile.Left_Mobile, the_mobile.Left_arm, the_mobile.Cord,
+                              the_mobile.Right_arm, the_mobile.Right_Mobile)
+
+
+def test_compute_metrics_matches_recursion(chain):
+    expected = benchmark_mobiles.run_deep(benchmark_mobiles.old_compute_metrics, chain, {})
+    cache = {}
+    assert draw_mobiles.compute_metrics(chain, cache) == expected
+    assert expected.balanced
+    assert len(cache) == 2 * DEPTH + 1
+
+
+def test_width_matches_recursion(chain):
+    widest = benchmark_mobiles.run_deep(benchmark_mobiles.old_width_aux, chain)
+    assert draw_mobiles.width_aux(chain) == widest
+    assert draw_mobiles.width(chain) == 2 * widest
+    bushy = benchmark_mobiles.make_mobile(2001, 7)
+    assert draw_mobiles.width(bushy, {}) == 2 * benchmark_mobiles.old_width_aux(bushy)
+
+
+def test_draw_mobile_matches_draw_rod(chain, monkeypatch):
+    expected = benchmark_mobiles.Path_Recorder()
+    monkeypatch.setattr(draw_mobiles, "tt", expected)
+    monkeypatch.setattr(draw_mobiles, "draw_mobile", recursive_draw_mobile)
+    benchmark_mobiles.run_deep(recursive_draw_mobile, chain)
+    monkeypatch.undo()
+    drawn = benchmark_mobiles.Path_Recorder()
+    monkeypatch.setattr(draw_mobiles, "tt", drawn)
+    draw_mobiles.draw_mobile(chain)
+    assert drawn.calls == expected.calls
+
+
+def test_svg_mobile_draws_every_part(chain):
+    elements = draw_mobiles.svg_mobile(chain)
+    # every mobile has a cord and its label, then a ball adds its label and circle, and a rod its line
+    # and two arm labels
+    assert len(elements) == 2 * (2 * DEPTH + 1) + 2 * (DEPTH + 1) + 3 * DEPTH
+    assert elements[0].startswith('<line x1="0.00" y1="0.00"')
+
+
+def test_not_a_mobile_is_refused():
+    broken = Rod(1, 1, Ball(1, 1), 1, "ball")
+    for walk in (draw_mobiles.compute_metrics, draw_mobiles.svg_mobile):
+        with pytest.raises(Exception, match="Not a valid mobile"):
+            walk(broken)